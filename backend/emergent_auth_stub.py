@@ -0,0 +1,34 @@
+"""Local stand-in for the Emergent OAuth session-data endpoint.
+
+Lets Google sign-in be load-tested offline:
+
+    uvicorn emergent_auth_stub:app --port 8002
+    EMERGENT_AUTH_URL=http://localhost:8002/auth/v1/env/oauth/session-data uvicorn server:app
+
+Every session id maps to a stable fake Google user, e.g. X-Session-ID
+"load-42" signs in as load-42@stub.perspectiveupsc.com.
+"""
+from fastapi import FastAPI, Header, HTTPException
+import asyncio
+import hashlib
+import os
+
+# Simulated upstream latency per request
+STUB_LATENCY_MS = float(os.environ.get('STUB_LATENCY_MS', 50))
+
+app = FastAPI(title="Emergent Auth Stub")
+
+@app.get("/auth/v1/env/oauth/session-data")
+async def session_data(x_session_id: str = Header(None)):
+    if not x_session_id:
+        raise HTTPException(status_code=401, detail="Missing session id")
+
+    await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    digest = hashlib.sha256(x_session_id.encode()).hexdigest()
+    return {
+        "id": digest[:24],
+        "email": f"{x_session_id}@stub.perspectiveupsc.com",
+        "name": f"Stub User {x_session_id}",
+        "picture": "",
+        "session_token": digest
+    }
@@ -0,0 +1,70 @@
+"""Convert stored TestResult answers from int arrays to packed binary.
+
+Walks db.test_results in _id order and rewrites every result whose answers
+are still a BSON array, one unordered bulk write per batch. Safe to stop
+and re-run: converted documents no longer match the filter.
+
+    python migrate_answers.py [--batch-size 5000] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+
+import bson
+from pymongo import UpdateOne
+
+from server import client, db, pack_answers
+
+UNPACKED = {"answers": {"$type": "array"}}
+
+
+async def migrate(batch_size: int, dry_run: bool):
+    total = await db.test_results.count_documents(UNPACKED)
+    print(f"{total} results with unpacked answers")
+    if dry_run or not total:
+        return
+
+    started = time.perf_counter()
+    converted = 0
+    saved_bytes = 0
+    last_id = None
+    while True:
+        match = dict(UNPACKED)
+        if last_id is not None:
+            match["_id"] = {"$gt": last_id}
+        batch = await db.test_results.find(match, {"answers": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for result in batch:
+            try:
+                packed = pack_answers(result["answers"])
+            except ValueError as e:
+                print(f"Skipping result {result['_id']}: {e}")
+                continue
+            saved_bytes += len(bson.encode({"answers": result["answers"]})) - len(bson.encode({"answers": packed}))
+            # Only convert documents that are still unpacked
+            operations.append(UpdateOne({"_id": result["_id"], **UNPACKED}, {"$set": {"answers": packed}}))
+        last_id = batch[-1]["_id"]
+        if not operations:
+            continue
+        written = await db.test_results.bulk_write(operations, ordered=False)
+        converted += written.modified_count
+        rate = converted / (time.perf_counter() - started)
+        print(f"{converted}/{total} converted ({rate:.0f}/s), {saved_bytes / 1024 / 1024:.1f} MB saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dry-run", action="store_true", help="only count the results to convert")
+    args = parser.parse_args()
+    try:
+        asyncio.run(migrate(args.batch_size, args.dry_run))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
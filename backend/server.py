@@ -1,21 +1,40 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response, Cookie
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response, Cookie, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import bson
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, model_validator
+from typing import Any, Callable, Dict, List, Optional
 import uuid
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
+from passlib.hash import bcrypt as bcrypt_hasher
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import secrets
+import base64
+import hmac
+import hashlib
+import math
+import json
+import gzip
+import numpy as np
 import pandas as pd
 from io import BytesIO
 import razorpay
@@ -33,9 +52,29 @@ db = client[os.environ['DB_NAME']]
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', 7))
+JWT_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_CACHE_MAX_ENTRIES', 20000))
+TOKEN_EPOCH_SYNC_SECONDS = float(os.environ.get('TOKEN_EPOCH_SYNC_SECONDS', 5))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+SESSION_CACHE_MAX_ENTRIES = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', 10000))
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get('SESSION_CACHE_TTL_SECONDS', 60))
+# Without a sessions change stream, a logout elsewhere is only seen after this long
+SESSION_CACHE_UNWATCHED_TTL_SECONDS = float(os.environ.get('SESSION_CACHE_UNWATCHED_TTL_SECONDS', 5))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 0))  # 0 = calibrate once, shared in db.app_settings
+BCRYPT_TARGET_MS = float(os.environ.get('BCRYPT_TARGET_MS', 250))
+BCRYPT_MIN_ROUNDS = int(os.environ.get('BCRYPT_MIN_ROUNDS', 10))
+BCRYPT_MAX_ROUNDS = int(os.environ.get('BCRYPT_MAX_ROUNDS', 14))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 32 * PASSWORD_HASH_WORKERS))
+LOGIN_MAX_CONCURRENCY = int(os.environ.get('LOGIN_MAX_CONCURRENCY', 2 * PASSWORD_HASH_WORKERS))
+LOGIN_MAX_QUEUE = int(os.environ.get('LOGIN_MAX_QUEUE', 256))
+LOGIN_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('LOGIN_QUEUE_TIMEOUT_SECONDS', 3))
+LOGIN_RETRY_AFTER_SECONDS = int(os.environ.get('LOGIN_RETRY_AFTER_SECONDS', 5))
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Email configuration
 SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
@@ -44,6 +83,26 @@ SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
 FROM_EMAIL = os.environ.get('FROM_EMAIL')
 
+# Keyset pagination for list endpoints
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+
+# Catalog snapshot: workers re-check the catalog version at most this often
+CATALOG_STALENESS_SECONDS = float(os.environ.get('CATALOG_STALENESS_SECONDS', 5))
+TEST_CACHE_MAX_BYTES = int(os.environ.get('TEST_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Background re-scoring of stored results
+RESCORE_BATCH_SIZE = int(os.environ.get('RESCORE_BATCH_SIZE', 5000))
+# A running job whose heartbeat is older than this is treated as dead
+RESCORE_JOB_STALE_SECONDS = float(os.environ.get('RESCORE_JOB_STALE_SECONDS', 60))
+RESCORE_HEARTBEAT_SECONDS = float(os.environ.get('RESCORE_HEARTBEAT_SECONDS', 10))
+
+# Emergent authentication service
+EMERGENT_AUTH_URL = os.environ.get('EMERGENT_AUTH_URL', 'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data')
+EMERGENT_AUTH_CONNECT_TIMEOUT = float(os.environ.get('EMERGENT_AUTH_CONNECT_TIMEOUT', 3))
+EMERGENT_AUTH_READ_TIMEOUT = float(os.environ.get('EMERGENT_AUTH_READ_TIMEOUT', 10))
+EMERGENT_AUTH_POOL_SIZE = int(os.environ.get('EMERGENT_AUTH_POOL_SIZE', 100))
+
 # Create the main app without a prefix
 app = FastAPI(title="Test Platform API")
 
@@ -90,6 +149,30 @@ class User(UserBase):
     password: str  # Add password field for database storage
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
+    token_epoch: int = 0  # Bumped to revoke every token issued before
+
+class AuthPrincipal:
+    """Authenticated identity as resolved by the auth dependencies.
+
+    A plain slotted object rather than a model: it is built from signed
+    claims or a projected user document on every request, so it skips
+    validation. Depend on get_current_user_document for the full User.
+    """
+    __slots__ = ("id", "email", "name", "role", "is_active")
+
+    def __init__(self, id: str, email: str, name: str, role: str, is_active: bool = True):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_document(cls, user: Dict[str, Any]) -> "AuthPrincipal":
+        return cls(user["id"], user["email"], user["name"], user["role"], user.get("is_active", True))
+
+# Fields read by the auth dependencies, used to project users lookups
+PRINCIPAL_PROJECTION = {"_id": 0, "id": 1, "email": 1, "name": 1, "role": 1, "is_active": 1, "token_epoch": 1}
 
 class UserResponse(BaseModel):
     id: str
@@ -102,6 +185,19 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class RefreshToken(BaseModel):
+    id: str = Field(default_factory=lambda: secrets.token_urlsafe(32))
+    family_id: str = Field(default_factory=lambda: str(uuid.uuid4()))  # All rotations of one login
+    user_id: str
+    claims: Dict[str, Any]  # Access token claims as of login
+    used: bool = False
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
 
 class Question(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -109,12 +205,30 @@ class Question(BaseModel):
     options: List[str]  # 4 options
     correct_answer: int  # Index of correct option (0-3)
     explanation: Optional[str] = None
+    section: Optional[str] = None
 
 class QuestionCreate(BaseModel):
     question_text: str
     options: List[str]
     correct_answer: int
     explanation: Optional[str] = None
+    section: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_correct_answer(self):
+        if not 0 <= self.correct_answer < len(self.options):
+            raise ValueError(f"correct_answer must be an option index from 0 to {len(self.options) - 1}")
+        return self
+
+class AnswerKeyUpdate(BaseModel):
+    correct_answer: int = Field(..., ge=0)
+    explanation: Optional[str] = None
+
+class MarkingScheme(BaseModel):
+    marks_per_question: float = 1.0
+    negative_marking_ratio: float = Field(0.0, ge=0)  # Share of the marks deducted per wrong answer, 1/3 for UPSC prelims
+    unattempted_marks: float = 0.0
+    section_weights: Dict[str, float] = {}  # Multiplier per section name, 1.0 when absent
 
 class Test(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -126,6 +240,9 @@ class Test(BaseModel):
     created_by: str  # admin user id
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
+    questions_count: int = 0  # Denormalized len(questions) for catalog queries
+    content_version: int = 1  # Bumped by bump_catalog_version(content_changed=True) on question or answer edits
+    marking_scheme: MarkingScheme = Field(default_factory=MarkingScheme)
 
 class TestCreate(BaseModel):
     title: str
@@ -133,6 +250,7 @@ class TestCreate(BaseModel):
     price: float
     duration_minutes: int
     questions: List[QuestionCreate]
+    marking_scheme: MarkingScheme = Field(default_factory=MarkingScheme)
 
 class TestResponse(BaseModel):
     id: str
@@ -154,15 +272,30 @@ class Purchase(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     completed_at: Optional[datetime] = None
 
+class SectionScore(BaseModel):
+    name: str
+    score: float
+    max_score: float
+    correct: int
+    wrong: int
+    unattempted: int
+
 class TestResult(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_id: str
     test_id: str
-    answers: List[int]  # Student's selected options
-    score: int
+    answers: List[int]  # Student's selected options; stored bit-packed, see pack_answers
+    score: float  # Marks after negative marking
     total_questions: int
     time_taken_minutes: int
     completed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Results stored before marking schemes only have score (= correct count)
+    max_score: Optional[float] = None
+    correct_count: Optional[int] = None
+    wrong_count: Optional[int] = None
+    unattempted_count: Optional[int] = None
+    sections: List[SectionScore] = []
+    content_version: int = 1  # Paper version the result was scored against
 
 class CartItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -220,6 +353,7 @@ class GoogleAuthRequest(BaseModel):
 class GoogleAuthResponse(BaseModel):
     access_token: str
     user: UserResponse
+    refresh_token: Optional[str] = None
 
 # ===== UTILITY FUNCTIONS =====
 def verify_password(plain_password, hashed_password):
@@ -228,6 +362,230 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password, returning a replacement hash if its cost is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Pick the bcrypt cost whose hashing time on this host is closest to target_ms"""
+    probe_rounds = 8
+    samples = []
+    for _ in range(5):
+        started = time.perf_counter()
+        bcrypt_hasher.using(rounds=probe_rounds).hash("calibration")
+        samples.append((time.perf_counter() - started) * 1000)
+    probe_ms = sorted(samples)[len(samples) // 2]
+    # Each extra round doubles the work
+    rounds = probe_rounds + round(math.log2(target_ms / probe_ms))
+    return max(min_rounds, min(max_rounds, rounds))
+
+def set_bcrypt_rounds(rounds: int):
+    # Only the minimum is pinned: weaker hashes are upgraded on login, but
+    # stronger ones are left alone so a cost change never flips back and forth
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds
+    )
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed millisecond buckets"""
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds: float):
+        elapsed_ms = seconds * 1000
+        index = 0
+        while index < len(self.BUCKETS_MS) and elapsed_ms > self.BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.BUCKETS_MS, self.counts):
+            cumulative += count
+            buckets[f"le_{bound}ms"] = cumulative
+        buckets["le_inf"] = self.total
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 2) if self.total else 0.0,
+            "buckets": buckets
+        }
+
+class PasswordService:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    The bcrypt backend releases the GIL while hashing, so a thread pool
+    scales with cores without re-importing the app in worker processes.
+    Calls beyond the queue depth are refused instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.bcrypt_rounds: Optional[int] = None
+        self.latency = {"hash": LatencyHistogram(), "verify": LatencyHistogram()}
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.queue_depth:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"}
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.latency[operation].observe(time.perf_counter() - started)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self._run("verify", verify_and_update_password, plain_password, hashed_password)
+
+    async def calibrate(self):
+        """Use BCRYPT_ROUNDS, or the cost shared by every worker in db.app_settings.
+
+        The first worker to start calibrates on its host and stores the
+        result; the others adopt it, so all workers hash at the same cost.
+        """
+        rounds = BCRYPT_ROUNDS
+        if not rounds:
+            rounds = await self._shared_rounds()
+        set_bcrypt_rounds(rounds)
+        self.bcrypt_rounds = rounds
+        logger.info(f"Using bcrypt cost {rounds} (target {BCRYPT_TARGET_MS}ms)")
+
+    async def _shared_rounds(self) -> int:
+        try:
+            shared = await db.app_settings.find_one({"_id": "bcrypt_rounds"})
+            if shared:
+                return shared["rounds"]
+        except Exception as e:
+            logger.error(f"Could not read shared bcrypt cost: {str(e)}")
+        
+        loop = asyncio.get_running_loop()
+        calibrated = await loop.run_in_executor(
+            self.executor, calibrate_bcrypt_rounds,
+            BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS
+        )
+        try:
+            # First writer wins; everyone else adopts its cost
+            shared = await db.app_settings.find_one_and_update(
+                {"_id": "bcrypt_rounds"},
+                {"$setOnInsert": {"rounds": calibrated, "calibrated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            shared = await db.app_settings.find_one({"_id": "bcrypt_rounds"})
+        except Exception as e:
+            logger.error(f"Could not share bcrypt cost, using this host's: {str(e)}")
+            shared = {"rounds": calibrated}
+        return shared["rounds"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bcrypt_rounds": self.bcrypt_rounds,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "hash_latency": self.latency["hash"].snapshot(),
+            "verify_latency": self.latency["verify"].snapshot()
+        }
+
+password_service = PasswordService(workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE_DEPTH)
+
+class AdmissionController:
+    """Concurrency gate with a bounded wait queue and a queueing deadline.
+
+    Requests that cannot be queued, or wait past the deadline, are shed
+    with 503 and Retry-After so a burst cannot stall unrelated endpoints.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.wait_latency = LatencyHistogram()
+
+    def _shed(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts right now, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    @asynccontextmanager
+    async def admit(self):
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.shed_queue_full += 1
+            raise self._shed()
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            raise self._shed()
+        finally:
+            self.waiting -= 1
+            self.wait_latency.observe(time.perf_counter() - started)
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queue_wait": self.wait_latency.snapshot()
+        }
+
+login_admission = AdmissionController(
+    max_concurrency=LOGIN_MAX_CONCURRENCY,
+    max_queue=LOGIN_MAX_QUEUE,
+    queue_timeout=LOGIN_QUEUE_TIMEOUT_SECONDS,
+    retry_after=LOGIN_RETRY_AFTER_SECONDS
+)
+
 def calculate_bundle_discount(items: List[CartItem]) -> Dict[str, Any]:
     """Calculate bundle discount based on number of items"""
     if not items:
@@ -270,6 +628,70 @@ def calculate_bundle_discount(items: List[CartItem]) -> Dict[str, Any]:
         "bundle_info": bundle_info
     }
 
+# TestResponse fields of a test, with questions counted server-side for
+# tests stored before questions_count was denormalized
+TEST_SUMMARY_PROJECTION = {
+    "id": 1,
+    "title": 1,
+    "description": 1,
+    "price": 1,
+    "duration_minutes": 1,
+    "created_at": 1,
+    "questions_count": {"$ifNull": ["$questions_count", {"$size": "$questions"}]}
+}
+
+# TEST_SUMMARY_PROJECTION of a test joined into the "test" field of a purchase
+PURCHASED_TEST_PROJECTION = {"test": {
+    **{field: f"$test.{field}" for field, spec in TEST_SUMMARY_PROJECTION.items() if spec == 1},
+    "questions_count": {"$ifNull": ["$test.questions_count", {"$size": {"$ifNull": ["$test.questions", []]}}]}
+}}
+
+def test_summary_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aggregation returning only the TestResponse fields of matching tests"""
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, **TEST_SUMMARY_PROJECTION}}
+    ]
+
+def encode_cursor(object_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(object_id.binary).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+async def fetch_page(
+    collection,
+    match: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    stages: Optional[List[Dict[str, Any]]] = None
+):
+    """Fetch one page of documents in _id order, resuming after an opaque cursor.
+
+    Extra stages (e.g. a $lookup) run on the page only, after the limit.
+    Returns the page and the cursor of the next page, or None on the last.
+    """
+    if cursor:
+        match = {**match, "_id": {"$gt": decode_cursor(cursor)}}
+    pipeline = [{"$match": match}, {"$sort": {"_id": 1}}, {"$limit": limit + 1}]
+    pipeline.extend(stages or [])
+    if projection:
+        pipeline.append({"$project": projection})
+    docs = await collection.aggregate(pipeline).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
 async def send_reset_email(email: str, otp: str) -> bool:
     """Send password reset email with 6-digit OTP"""
     if not SMTP_USERNAME or not SMTP_PASSWORD:
@@ -364,29 +786,347 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# ===== BOUNDED CACHES =====
+class BoundedLRU:
+    """OrderedDict-backed LRU with a size budget and optional per-entry TTL.
+
+    Entries weigh 1 unless put() is given a size (bytes for test papers).
+    Expired entries count as misses and are dropped on lookup. on_drop is
+    called with (key, value) whenever an entry leaves, so owners can keep
+    secondary indexes in step.
+    """
+
+    def __init__(self, max_size: float, on_drop: Optional[Callable[[Any, Any], None]] = None):
+        self.max_size = max_size
+        self.on_drop = on_drop
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self.pop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: Any, value: Any, ttl_seconds: float = math.inf, size: float = 1):
+        self.pop(key)
+        self._entries[key] = (time.monotonic() + ttl_seconds, size, value)
+        self.size += size
+        while self.size > self.max_size:
+            self.pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def pop(self, key: Any) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.size -= entry[1]
+        if self.on_drop is not None:
+            self.on_drop(key, entry[2])
+        return entry[2]
+
+    def items(self) -> List[tuple]:
+        return [(key, entry[2]) for key, entry in self._entries.items()]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+def poll_since(synced_at: datetime, interval_seconds: float) -> datetime:
+    """Lower bound of a change poll: the previous poll minus one interval.
+
+    A write stamped just before the previous poll may only have become
+    visible after it, so consecutive polls overlap.
+    """
+    return synced_at - timedelta(seconds=interval_seconds)
+
+# ===== USER CACHE =====
+class UserCache:
+    """Bounded TTL/LRU cache of user documents, addressable by id and email"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = BoundedLRU(max_entries, on_drop=self._forget_email)  # id -> user
+        self._ids_by_email: Dict[str, str] = {}
+        self.invalidations = 0
+
+    def get(self, user_id: Optional[str] = None, email: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if user_id is None and email is not None:
+            user_id = self._ids_by_email.get(email)
+        return self._entries.get(user_id)
+
+    def put(self, user: Dict[str, Any]):
+        self._entries.put(user["id"], user, ttl_seconds=self.ttl_seconds)
+        self._ids_by_email[user["email"]] = user["id"]
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        if email is not None:
+            self._entries.pop(self._ids_by_email.get(email))
+        if user_id is not None:
+            self._entries.pop(user_id)
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._ids_by_email.clear()
+        self.invalidations += 1
+
+    def _forget_email(self, user_id: str, user: Dict[str, Any]):
+        if self._ids_by_email.get(user["email"]) == user_id:
+            del self._ids_by_email[user["email"]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._entries.stats(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "invalidations": self.invalidations
+        }
+
+user_cache = UserCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+async def find_user(user_id: Optional[str] = None, email: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Fetch the principal fields of a user by id or email through the user cache"""
+    user = user_cache.get(user_id=user_id, email=email)
+    if user is None:
+        query = {"id": user_id} if user_id is not None else {"email": email}
+        user = await db.users.find_one(query, PRINCIPAL_PROJECTION)
+        if user is not None:
+            user_cache.put(user)
+    return user
+
+def publish_user_change(user_id: Optional[str] = None, email: Optional[str] = None):
+    """Drop a changed user from this worker's cache.
+
+    Other workers hear about the write through watch_user_changes. Without a
+    replica set there is no change stream, and their entries age out by TTL.
+    """
+    user_cache.invalidate(user_id=user_id, email=email)
+    if user_id is not None:
+        session_cache.invalidate(user_id=user_id)
+
+async def watch_user_changes():
+    """Invalidate cached users on every write to db.users, from any worker"""
+    try:
+        async with db.users.watch(full_document="updateLookup") as stream:
+            async for change in stream:
+                user = change.get("fullDocument")
+                if user:
+                    user_cache.invalidate(user_id=user.get("id"), email=user.get("email"))
+                    session_cache.invalidate(user_id=user.get("id"))
+                else:
+                    user_cache.clear()
+                    session_cache.clear()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"User change stream unavailable, user cache relies on TTL: {str(e)}")
+
+def principal_claims(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Signed identity claims that let auth dependencies skip the users lookup"""
+    return {
+        "sub": user["email"],
+        "uid": user["id"],
+        "name": user["name"],
+        "role": user["role"],
+        "active": user.get("is_active", True),
+        "epoch": user.get("token_epoch", 0),
+    }
+
+class TokenEpochTable:
+    """Latest token epoch of users whose tokens were recently revoked.
+
+    Only users revoked within the access token lifetime are tracked: tokens
+    issued before an older revocation have expired anyway. Each worker
+    converges by polling users whose epoch changed since its last sync.
+    """
+
+    def __init__(self, window: timedelta):
+        self.window = window
+        self._epochs: Dict[str, tuple] = {}  # user_id -> (epoch, changed_at)
+        self._synced_at: Optional[datetime] = None
+
+    def is_current(self, user_id: str, epoch: int) -> bool:
+        known = self._epochs.get(user_id)
+        return known is None or epoch >= known[0]
+
+    def record(self, user_id: str, epoch: int, changed_at: datetime):
+        known = self._epochs.get(user_id)
+        if known is None or epoch > known[0]:
+            self._epochs[user_id] = (epoch, changed_at)
+            user_cache.invalidate(user_id=user_id)
+
+    async def sync(self):
+        now = datetime.now(timezone.utc)
+        since = now - self.window
+        if self._synced_at is not None:
+            since = max(since, poll_since(self._synced_at, TOKEN_EPOCH_SYNC_SECONDS))
+        cursor = db.users.find(
+            {"token_epoch_changed_at": {"$gt": since}},
+            {"_id": 0, "id": 1, "token_epoch": 1, "token_epoch_changed_at": 1}
+        )
+        async for user in cursor:
+            changed_at = user["token_epoch_changed_at"]
+            if changed_at.tzinfo is None:
+                changed_at = changed_at.replace(tzinfo=timezone.utc)
+            self.record(user["id"], user["token_epoch"], changed_at)
+        cutoff = now - self.window
+        self._epochs = {
+            user_id: entry for user_id, entry in self._epochs.items()
+            if entry[1] > cutoff
+        }
+        self._synced_at = now
+
+    async def run_sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Token epoch sync failed: {str(e)}")
+            await asyncio.sleep(TOKEN_EPOCH_SYNC_SECONDS)
+
+token_epochs = TokenEpochTable(window=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+async def revoke_user_tokens(query: Dict[str, Any], extra_set: Optional[Dict[str, Any]] = None):
+    """Bump the token epoch of a user, invalidating every token issued before"""
+    changed_at = datetime.now(timezone.utc)
+    user = await db.users.find_one_and_update(
+        query,
+        {
+            "$set": {**(extra_set or {}), "token_epoch_changed_at": changed_at},
+            "$inc": {"token_epoch": 1}
+        },
+        projection={"_id": 0, "id": 1, "token_epoch": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if user:
+        token_epochs.record(user["id"], user["token_epoch"], changed_at)
+        publish_user_change(user_id=user["id"])
+        await db.refresh_tokens.delete_many({"user_id": user["id"]})
+    return user
+
+def sign_refresh_token_id(token_id: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), token_id.encode(), hashlib.sha256).hexdigest()
+
+async def issue_refresh_token(claims: Dict[str, Any], family_id: Optional[str] = None) -> str:
+    """Store a single-use refresh token and return its signed client value"""
+    refresh_token = RefreshToken(user_id=claims["uid"], claims=claims)
+    if family_id is not None:
+        refresh_token.family_id = family_id
+    await db.refresh_tokens.insert_one(refresh_token.dict())
+    return f"{refresh_token.id}.{sign_refresh_token_id(refresh_token.id)}"
+
+class DecodedTokenCache:
+    """Bounded memo of verified JWT claims keyed by token digest.
+
+    Browsers resend the same token for its whole lifetime, so repeat
+    requests skip signature verification. Entries die with the exp claim.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = BoundedLRU(max_entries)  # token digest -> claims
+        self.decode_seconds = 0.0
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self._entries.get(key)
+        if payload is not None:
+            return payload
+        
+        started = time.perf_counter()
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        self.decode_seconds += time.perf_counter() - started
+        if "exp" in payload:
+            self._entries.put(key, payload, ttl_seconds=payload["exp"] - time.time())
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._entries.stats()
+        avg_decode_us = self.decode_seconds / stats["misses"] * 1e6 if stats["misses"] else 0.0
+        return {
+            **stats,
+            "max_entries": self.max_entries,
+            "avg_decode_us": round(avg_decode_us, 2),
+            "cpu_saved_ms": round(stats["hits"] * avg_decode_us / 1000, 2)
+        }
+
+decoded_tokens = DecodedTokenCache(max_entries=JWT_CACHE_MAX_ENTRIES)
+
+async def get_principal_from_token(token: str) -> AuthPrincipal:
+    """Resolve a JWT, trusting its signed claims unless the user was revoked"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decoded_tokens.decode(token)
         token_subject: str = payload.get("sub")
         if token_subject is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    
-    # Find user by email
-    user = await db.users.find_one({"email": token_subject})
-    
-    if user is None:
+
+    user_id = payload.get("uid")
+    token_epoch = payload.get("epoch", 0)
+
+    # Fast path: claims are signed, only revoked users need the database
+    if user_id is not None and token_epochs.is_current(user_id, token_epoch):
+        if not payload.get("active", True):
+            raise credentials_exception
+        return AuthPrincipal(
+            user_id,
+            token_subject,
+            payload.get("name", ""),
+            payload.get("role", UserRole.STUDENT)
+        )
+
+    user = await find_user(email=token_subject)
+
+    if user is None or not user.get("is_active", True):
+        raise credentials_exception
+    if user_id is not None and token_epoch != user.get("token_epoch", 0):
         raise credentials_exception
+    return AuthPrincipal.from_document(user)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> AuthPrincipal:
+    return await get_principal_from_token(credentials.credentials)
+
+async def get_current_user_document(current_user: AuthPrincipal = Depends(get_current_user)) -> User:
+    """Opt-in dependency for handlers that need the full stored User"""
+    user = await db.users.find_one({"id": current_user.id})
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return User(**user)
 
-async def require_admin(current_user: User = Depends(get_current_user)):
+async def require_admin(current_user: AuthPrincipal = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -395,45 +1135,232 @@ async def require_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 # ===== GOOGLE/EMERGENT AUTHENTICATION FUNCTIONS =====
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    Each finished flight records how many extra callers it absorbed, so the
+    metrics show whether coalescing actually happens under a stampede.
+    """
+    WAITER_BUCKETS = (0, 1, 10, 100, 1000)
+
+    def __init__(self):
+        self._flights: Dict[Any, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.flights = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self.waiter_counts = [0] * (len(self.WAITER_BUCKETS) + 1)
+
+    def _land(self, key: Any, flight: asyncio.Future):
+        waiters = self._waiters.pop(flight, 0)
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        index = 0
+        while index < len(self.WAITER_BUCKETS) and waiters > self.WAITER_BUCKETS[index]:
+            index += 1
+        self.waiter_counts[index] += 1
+        self.max_waiters = max(self.max_waiters, waiters)
+
+    async def do(self, key: Any, func):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            self._waiters[flight] = 0
+            flight.add_done_callback(lambda done: self._land(key, done))
+            self.flights += 1
+        else:
+            self._waiters[flight] += 1
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not fail the others
+        return await asyncio.shield(flight)
+
+    def forget(self, key: Any):
+        """Start a fresh call for the next caller; current waiters keep theirs"""
+        self._flights.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        waiters_per_flight = {}
+        cumulative = 0
+        for bound, count in zip(self.WAITER_BUCKETS, self.waiter_counts):
+            cumulative += count
+            waiters_per_flight[f"le_{bound}"] = cumulative
+        waiters_per_flight["le_inf"] = sum(self.waiter_counts)
+        landed = waiters_per_flight["le_inf"]
+        return {
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "avg_waiters": round(self.coalesced / self.flights, 2) if self.flights else 0.0,
+            "max_waiters": self.max_waiters,
+            "waiters_per_flight": waiters_per_flight
+        }
+
+class EmergentAuthClient:
+    """Keep-alive HTTP client for the Emergent session-data endpoint"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.singleflight = SingleFlight()
+        self.latency = LatencyHistogram()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(
+                    connect=EMERGENT_AUTH_CONNECT_TIMEOUT,
+                    sock_read=EMERGENT_AUTH_READ_TIMEOUT
+                ),
+                connector=aiohttp.TCPConnector(
+                    limit=EMERGENT_AUTH_POOL_SIZE,
+                    keepalive_timeout=60
+                )
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def _fetch_session_data(self, session_id: str) -> Optional[Dict]:
+        started = time.perf_counter()
+        try:
+            headers = {"X-Session-ID": session_id}
+            async with self._get_session().get(self.url, headers=headers) as response:
+                if response.status == 200:
+                    return await response.json()
+                logger.error(f"Emergent auth API returned status {response.status}")
+                return None
+        finally:
+            self.latency.observe(time.perf_counter() - started)
+
+    async def get_session_data(self, session_id: str) -> Optional[Dict]:
+        # Double-submitted callbacks for one session share a single request
+        return await self.singleflight.do(session_id, lambda: self._fetch_session_data(session_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.singleflight.stats(),
+            "latency": self.latency.snapshot()
+        }
+
+emergent_auth_client = EmergentAuthClient(EMERGENT_AUTH_URL)
+
 async def get_emergent_user_data(session_id: str) -> Optional[Dict]:
     """Get user data from Emergent authentication service"""
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {"X-Session-ID": session_id}
-            async with session.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers=headers
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    logger.error(f"Emergent auth API returned status {response.status}")
-                    return None
+        return await emergent_auth_client.get_session_data(session_id)
     except Exception as e:
         logger.error(f"Error calling Emergent auth API: {str(e)}")
         return None
 
-async def get_user_by_session_token(session_token: str) -> Optional[User]:
-    """Get user by session token from database"""
+class SessionCache:
+    """Bounded cache of session token -> principal, never outliving the session.
+
+    Entries remember the session document's _id so that deletes and updates
+    seen on the sessions change stream can drop them on every worker.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = BoundedLRU(max_entries, on_drop=self._forget_session_id)  # token -> (principal, session_id)
+        self._tokens: Dict[Any, str] = {}  # session_id -> token
+
+    def get(self, session_token: str) -> Optional[AuthPrincipal]:
+        entry = self._entries.get(session_token)
+        return entry[0] if entry is not None else None
+
+    def put(self, session_token: str, principal: AuthPrincipal, session_expires_at: datetime, session_id: Any = None):
+        if session_expires_at.tzinfo is None:
+            session_expires_at = session_expires_at.replace(tzinfo=timezone.utc)
+        remaining = (session_expires_at - datetime.now(timezone.utc)).total_seconds()
+        self._entries.put(session_token, (principal, session_id), ttl_seconds=min(self.ttl_seconds, remaining))
+        if session_id is not None:
+            self._tokens[session_id] = session_token
+
+    def _forget_session_id(self, session_token: str, entry: tuple):
+        if entry[1] is not None and self._tokens.get(entry[1]) == session_token:
+            del self._tokens[entry[1]]
+
+    def invalidate(self, session_token: Optional[str] = None, user_id: Optional[str] = None, session_id: Any = None):
+        if session_token is not None:
+            self._entries.pop(session_token)
+        if session_id is not None and session_id in self._tokens:
+            self._entries.pop(self._tokens[session_id])
+        if user_id is not None:
+            for token, entry in self._entries.items():
+                if entry[0].id == user_id:
+                    self._entries.pop(token)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._entries.stats(), "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+session_cache = SessionCache(max_entries=SESSION_CACHE_MAX_ENTRIES, ttl_seconds=SESSION_CACHE_TTL_SECONDS)
+
+async def watch_session_changes():
+    """Drop cached sessions that were deleted or replaced, from any worker"""
     try:
-        session_data = await db.sessions.find_one({"session_token": session_token})
-        if not session_data or session_data["expires_at"] < datetime.now(timezone.utc):
+        async with db.sessions.watch() as stream:
+            async for change in stream:
+                session_cache.invalidate(session_id=change["documentKey"]["_id"])
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        session_cache.ttl_seconds = min(session_cache.ttl_seconds, SESSION_CACHE_UNWATCHED_TTL_SECONDS)
+        logger.warning(
+            f"Session change stream unavailable, cached sessions may outlive a logout on another "
+            f"worker by up to {session_cache.ttl_seconds}s: {str(e)}"
+        )
+
+async def get_user_by_session_token(session_token: str) -> Optional[AuthPrincipal]:
+    """Get user by session token, joining session and user in one query"""
+    principal = session_cache.get(session_token)
+    if principal is not None:
+        return principal
+    try:
+        sessions = await db.sessions.aggregate([
+            {"$match": {
+                "session_token": session_token,
+                "expires_at": {"$gt": datetime.now(timezone.utc)}
+            }},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "id",
+                "as": "user"
+            }},
+            {"$unwind": "$user"},
+            {"$project": {
+                "expires_at": 1,
+                "user.id": 1,
+                "user.email": 1,
+                "user.name": 1,
+                "user.role": 1,
+                "user.is_active": 1
+            }}
+        ]).to_list(1)
+        if not sessions or not sessions[0]["user"].get("is_active", True):
             return None
         
-        user_data = await db.users.find_one({"id": session_data["user_id"]})
-        if user_data:
-            return User(**user_data)
-        return None
+        principal = AuthPrincipal.from_document(sessions[0]["user"])
+        session_cache.put(session_token, principal, sessions[0]["expires_at"], session_id=sessions[0]["_id"])
+        return principal
     except Exception as e:
         logger.error(f"Error getting user by session token: {str(e)}")
         return None
 
 # Updated authentication dependency to support both JWT and session tokens
 async def get_current_user_flexible(
-    authorization: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    authorization: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     session_token: Optional[str] = Cookie(None)
-) -> User:
+) -> AuthPrincipal:
     """Get current user from JWT token or session token"""
     
     credentials_exception = HTTPException(
@@ -442,28 +1369,20 @@ async def get_current_user_flexible(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # Try session token first (Google auth)
+    # Bearer tokens resolve from signed claims, so try them before the session
+    if authorization:
+        try:
+            return await get_principal_from_token(authorization.credentials)
+        except HTTPException:
+            if not session_token:
+                raise
+    
+    # Session token (Google auth)
     if session_token:
         user = await get_user_by_session_token(session_token)
         if user:
             return user
     
-    # Fallback to JWT token (email/password auth)
-    if authorization:
-        token = authorization.credentials
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            email: str = payload.get("sub")
-            if email is None:
-                raise credentials_exception
-        except jwt.PyJWTError:
-            raise credentials_exception
-        
-        user = await db.users.find_one({"email": email})
-        if user is None:
-            raise credentials_exception
-        return User(**user)
-    
     raise credentials_exception
 
 # ===== AUTHENTICATION ROUTES =====
@@ -478,13 +1397,14 @@ async def register_user(user: UserCreate):
         )
     
     # Hash password and create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_service.hash(user.password)
     user_data = user.dict()
     user_data["password"] = hashed_password
     user_data["role"] = UserRole.STUDENT  # Force student role
     
     new_user = User(**user_data)
     await db.users.insert_one(new_user.dict())
+    publish_user_change(user_id=new_user.id, email=new_user.email)
     
     return UserResponse(**new_user.dict())
 
@@ -492,17 +1412,31 @@ async def register_user(user: UserCreate):
 
 @api_router.post("/login", response_model=Token)
 async def login_user(user_credentials: UserLogin):
-    user = await db.users.find_one({"email": user_credentials.email})
-    if not user or not verify_password(user_credentials.password, user["password"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password"
-        )
+    async with login_admission.admit():
+        user = await db.users.find_one({"email": user_credentials.email})
+        valid, new_hash = False, None
+        if user:
+            valid, new_hash = await password_service.verify_and_update(
+                user_credentials.password, user["password"]
+            )
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password"
+            )
+    
+    # Transparently move the stored hash to the calibrated bcrypt cost
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password": new_hash}})
+        publish_user_change(user_id=user["id"])
+        password_service.rehashed += 1
     
+    claims = principal_claims(user)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["email"]}, expires_delta=access_token_expires
+        data=claims, expires_delta=access_token_expires
     )
+    refresh_token = await issue_refresh_token(claims)
     
     # Create UserResponse directly from database fields
     user_response = UserResponse(
@@ -516,7 +1450,54 @@ async def login_user(user_credentials: UserLogin):
     return Token(
         access_token=access_token,
         token_type="bearer",
-        user=user_response
+        user=user_response,
+        refresh_token=refresh_token
+    )
+
+@api_router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshTokenRequest):
+    """Rotate a refresh token into a new access token without a password check"""
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token"
+    )
+    token_id, _, signature = request.refresh_token.rpartition(".")
+    if not token_id or not hmac.compare_digest(signature, sign_refresh_token_id(token_id)):
+        raise invalid_token_exception
+    
+    now = datetime.now(timezone.utc)
+    stored = await db.refresh_tokens.find_one_and_update(
+        {"id": token_id, "used": False, "expires_at": {"$gt": now}},
+        {"$set": {"used": True}}
+    )
+    if not stored:
+        # A correctly signed token that was already used has been replayed:
+        # revoke every rotation of that login
+        replayed = await db.refresh_tokens.find_one({"id": token_id, "used": True})
+        if replayed:
+            await db.refresh_tokens.delete_many({"family_id": replayed["family_id"]})
+        raise invalid_token_exception
+    
+    claims = stored["claims"]
+    if not claims.get("active", True):
+        raise invalid_token_exception
+    
+    access_token = create_access_token(
+        data=claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = await issue_refresh_token(claims, family_id=stored["family_id"])
+    
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        user=UserResponse(
+            id=claims["uid"],
+            email=claims["sub"],
+            name=claims["name"],
+            role=claims["role"],
+            is_active=claims["active"]
+        ),
+        refresh_token=refresh_token
     )
 
 # ===== GOOGLE AUTHENTICATION ROUTES =====
@@ -568,6 +1549,7 @@ async def google_auth_callback(
             }
             
             await db.users.insert_one(user_data)
+            publish_user_change(user_id=user_id, email=email)
             user = User(**user_data)
         
         # Create/update session data
@@ -583,6 +1565,7 @@ async def google_auth_callback(
             {"$set": session_data.dict()},
             upsert=True
         )
+        session_cache.invalidate(user_id=user.id)
         
         # Set session cookie
         response.set_cookie(
@@ -596,10 +1579,12 @@ async def google_auth_callback(
         )
         
         # Also create JWT token for compatibility
+        claims = principal_claims(user.dict())
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data=claims, expires_delta=access_token_expires
         )
+        refresh_token = await issue_refresh_token(claims)
         
         user_response = UserResponse(
             id=user.id,
@@ -609,7 +1594,11 @@ async def google_auth_callback(
             is_active=user.is_active
         )
         
-        return GoogleAuthResponse(access_token=access_token, user=user_response)
+        return GoogleAuthResponse(
+            access_token=access_token,
+            user=user_response,
+            refresh_token=refresh_token
+        )
         
     except HTTPException:
         raise
@@ -621,7 +1610,7 @@ async def google_auth_callback(
         )
 
 @api_router.get("/profile")
-async def get_profile(current_user: User = Depends(get_current_user_flexible)):
+async def get_profile(current_user: AuthPrincipal = Depends(get_current_user_flexible)):
     """Get user profile (works with both JWT and session auth)"""
     return UserResponse(
         id=current_user.id,
@@ -632,11 +1621,17 @@ async def get_profile(current_user: User = Depends(get_current_user_flexible)):
     )
 
 @api_router.post("/logout")
-async def logout(response: Response, current_user: User = Depends(get_current_user_flexible)):
+async def logout(
+    response: Response,
+    current_user: AuthPrincipal = Depends(get_current_user_flexible),
+    session_token: Optional[str] = Cookie(None)
+):
     """Logout user (clear session token)"""
     try:
-        # Remove session from database
+        # Remove session and refresh tokens from database
         await db.sessions.delete_many({"user_id": current_user.id})
+        await db.refresh_tokens.delete_many({"user_id": current_user.id})
+        session_cache.invalidate(session_token=session_token, user_id=current_user.id)
         
         # Clear session cookie
         response.delete_cookie(
@@ -655,8 +1650,14 @@ async def logout(response: Response, current_user: User = Depends(get_current_us
         )
 
 @api_router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user_flexible)):
-    return UserResponse(**current_user.dict())
+async def get_current_user_info(current_user: AuthPrincipal = Depends(get_current_user_flexible)):
+    return UserResponse(
+        id=current_user.id,
+        email=current_user.email,
+        name=current_user.name,
+        role=current_user.role,
+        is_active=current_user.is_active
+    )
 
 @api_router.post("/forgot-password")
 async def forgot_password(request: ForgotPasswordRequest):
@@ -708,11 +1709,11 @@ async def reset_password(request: ResetPasswordRequest):
             detail="Invalid or expired OTP"
         )
     
-    # Update user password
-    hashed_password = get_password_hash(request.new_password)
-    await db.users.update_one(
+    # Update user password and revoke tokens issued with the old one
+    hashed_password = await password_service.hash(request.new_password)
+    await revoke_user_tokens(
         {"email": request.email},
-        {"$set": {"password_hash": hashed_password}}
+        extra_set={"password_hash": hashed_password}
     )
     
     # Mark reset OTP as used
@@ -723,32 +1724,698 @@ async def reset_password(request: ResetPasswordRequest):
     
     return {"message": "Password reset successfully"}
 
+# ===== SCORING =====
+UNANSWERED = -1
+DEFAULT_SECTION = "General"
+ANSWER_BITS = 3  # Options 0-6, all ones = unanswered
+PACKED_ANSWERS_SUBTYPE = 0x80  # User-defined BSON binary subtype
+MAX_PACKED_ANSWERS = 0xFFFF  # The count header is 2 bytes
+
+def pack_answers(answers: List[int]) -> bson.Binary:
+    """Bit-pack a submission for storage in TestResult.answers.
+
+    Layout: bits per answer (1 byte), answer count (2 bytes, big endian),
+    then the answers MSB first. Papers with more than 7 options widen the
+    field; an all-ones field means unanswered. Pack the sanitised row from
+    AnswerKey.answer_matrix so stray values cannot widen the field.
+    """
+    if len(answers) > MAX_PACKED_ANSWERS:
+        raise ValueError(f"Cannot pack {len(answers)} answers, the limit is {MAX_PACKED_ANSWERS}")
+    values = np.asarray(answers, dtype=np.int64)
+    widest = int(values.max()) + 1 if values.size else 0
+    bits = max(ANSWER_BITS, widest.bit_length())
+    values = np.where(values >= 0, values, (1 << bits) - 1)
+    bit_matrix = (values[:, None] >> np.arange(bits - 1, -1, -1)) & 1
+    payload = np.packbits(bit_matrix.astype(np.uint8))
+    header = bytes([bits]) + len(values).to_bytes(2, "big")
+    return bson.Binary(header + payload.tobytes(), PACKED_ANSWERS_SUBTYPE)
+
+def unpack_answers(stored: Any) -> List[int]:
+    """Answers of a stored result, packed or in the older int-array form"""
+    if isinstance(stored, list):
+        return stored
+    data = bytes(stored)
+    bits, count = data[0], int.from_bytes(data[1:3], "big")
+    bit_matrix = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=3), count=count * bits)
+    values = bit_matrix.reshape(count, bits).astype(np.int64) @ (1 << np.arange(bits - 1, -1, -1))
+    return np.where(values == (1 << bits) - 1, UNANSWERED, values).tolist()
+
+class ScoreSheet:
+    """Scores of a batch of submissions, one row per submission"""
+    __slots__ = ("score", "correct", "wrong", "unattempted", "section_scores",
+                 "section_correct", "section_wrong", "section_unattempted", "key")
+
+    def __init__(self, key: "AnswerKey", **columns: np.ndarray):
+        self.key = key
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """TestResult fields of every submission, in batch order"""
+        key = self.key
+        section_max = np.round(key.section_max, 2).tolist()
+        max_score = round(key.max_score, 2)
+        # Convert whole columns at once; per-element numpy access is slow
+        columns = zip(
+            np.round(self.score, 2).tolist(),
+            self.correct.tolist(),
+            self.wrong.tolist(),
+            self.unattempted.tolist(),
+            np.round(self.section_scores, 2).tolist(),
+            self.section_correct.astype(np.int64).tolist(),
+            self.section_wrong.astype(np.int64).tolist(),
+            self.section_unattempted.astype(np.int64).tolist()
+        )
+        rows = []
+        for score, correct, wrong, unattempted, scores, corrects, wrongs, unattempteds in columns:
+            sections = [
+                {
+                    "name": name,
+                    "score": section_score,
+                    "max_score": section_maximum,
+                    "correct": section_correct,
+                    "wrong": section_wrong,
+                    "unattempted": section_unattempted
+                }
+                for name, section_score, section_maximum, section_correct, section_wrong, section_unattempted
+                in zip(key.section_names, scores, section_max, corrects, wrongs, unattempteds)
+            ] if key.sectioned else []
+            rows.append({
+                "score": score,
+                "max_score": max_score,
+                "total_questions": key.size,
+                "correct_count": correct,
+                "wrong_count": wrong,
+                "unattempted_count": unattempted,
+                "sections": sections
+            })
+        return rows
+
+class AnswerKey:
+    """Answer key and marking scheme of one test version.
+
+    Submit, solutions and any re-scoring all go through this class so a
+    submission is always marked the same way. Marks, penalties and section
+    membership are per-question arrays, so a whole batch is scored in one
+    pass of array arithmetic.
+    """
+    __slots__ = ("correct", "option_counts", "marks", "penalties", "unattempted_marks",
+                 "section_names", "section_matrix", "section_max", "sectioned", "max_score")
+
+    def __init__(self, test: Dict[str, Any]):
+        questions = test["questions"]
+        scheme = MarkingScheme(**(test.get("marking_scheme") or {}))
+        self.correct = np.array([q["correct_answer"] for q in questions], dtype=np.int16)
+        self.option_counts = np.array([len(q["options"]) for q in questions], dtype=np.int16)
+        
+        sections = [q.get("section") or DEFAULT_SECTION for q in questions]
+        self.sectioned = any(q.get("section") for q in questions)
+        self.section_names = list(dict.fromkeys(sections)) or [DEFAULT_SECTION]
+        section_index = np.array([self.section_names.index(name) for name in sections], dtype=np.intp)
+        # One-hot question -> section map; answers @ section_matrix sums per section
+        self.section_matrix = np.zeros((len(questions), len(self.section_names)), dtype=np.float64)
+        self.section_matrix[np.arange(len(questions)), section_index] = 1.0
+        
+        weights = np.array(
+            [scheme.section_weights.get(name, 1.0) for name in self.section_names], dtype=np.float64
+        )[section_index]
+        self.marks = scheme.marks_per_question * weights
+        self.penalties = self.marks * scheme.negative_marking_ratio
+        self.unattempted_marks = scheme.unattempted_marks * weights
+        self.section_max = self.marks @ self.section_matrix
+        self.max_score = float(self.marks.sum())
+
+    @property
+    def size(self) -> int:
+        return len(self.correct)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in (
+            "correct", "option_counts", "marks", "penalties", "unattempted_marks", "section_matrix"
+        ))
+
+    def answer_matrix(self, submissions: List[List[int]]) -> np.ndarray:
+        """One row per submission, padded or cut to the key length.
+
+        Anything that is not a valid option index becomes UNANSWERED.
+        """
+        if all(len(answers) == self.size for answers in submissions):
+            raw = np.array(submissions, dtype=np.int64).reshape(len(submissions), self.size)
+        else:
+            raw = np.full((len(submissions), self.size), UNANSWERED, dtype=np.int64)
+            for row, answers in zip(raw, submissions):
+                answers = answers[:self.size]
+                row[:len(answers)] = answers
+        valid = (raw >= 0) & (raw < self.option_counts)
+        return np.where(valid, raw, UNANSWERED).astype(np.int16)
+
+    def matches(self, matrix: np.ndarray) -> np.ndarray:
+        """Boolean matrix of correct answers"""
+        return matrix == self.correct
+
+    def score_matrix(self, matrix: np.ndarray) -> ScoreSheet:
+        correct = self.matches(matrix)
+        attempted = matrix != UNANSWERED
+        wrong = attempted & ~correct
+        unattempted = ~attempted
+        points = np.where(correct, self.marks, np.where(wrong, -self.penalties, self.unattempted_marks))
+        section_scores = points @ self.section_matrix
+        return ScoreSheet(
+            self,
+            score=section_scores.sum(axis=1),
+            correct=correct.sum(axis=1),
+            wrong=wrong.sum(axis=1),
+            unattempted=unattempted.sum(axis=1),
+            section_scores=section_scores,
+            section_correct=correct @ self.section_matrix,
+            section_wrong=wrong @ self.section_matrix,
+            section_unattempted=unattempted @ self.section_matrix
+        )
+
+    def score_batch(self, submissions: List[List[int]]) -> ScoreSheet:
+        return self.score_matrix(self.answer_matrix(submissions))
+
+    def score(self, answers: List[int]) -> Dict[str, Any]:
+        """TestResult fields of a single submission"""
+        return self.score_batch([answers]).rows()[0]
+
+def result_percentage(result: Dict[str, Any]) -> float:
+    """Score as a percentage of the paper's maximum marks"""
+    max_score = result.get("max_score") or result["total_questions"]
+    return round((result["score"] / max_score) * 100, 2) if max_score else 0.0
+
+# ===== TEST CATALOG =====
+class CatalogSnapshot:
+    """Pre-encoded first page of GET /api/tests, rebuilt when the catalog version moves.
+
+    Test mutations bump a version counter in Mongo. Each worker compares
+    its snapshot against that counter at most once per staleness window,
+    so other workers serve a change within CATALOG_STALENESS_SECONDS.
+    """
+    encoder = TypeAdapter(List[TestResponse])
+
+    def __init__(self, staleness_seconds: float):
+        self.staleness_seconds = staleness_seconds
+        self.version: Optional[int] = None
+        self.body: Optional[bytes] = None
+        self.tests: List[TestResponse] = []
+        self.next_cursor: Optional[str] = None
+        self._checked_at = 0.0
+        self.singleflight = SingleFlight()
+        self.served = 0
+        self.rebuilds = 0
+
+    async def get(self):
+        """Version, encoded body, next-page cursor and tests of one consistent snapshot"""
+        if self.body is None or time.monotonic() - self._checked_at > self.staleness_seconds:
+            await self.singleflight.do("catalog", self._refresh)
+        self.served += 1
+        return self.version, self.body, self.next_cursor, self.tests
+
+    async def _refresh(self):
+        meta = await db.catalog_versions.find_one({"_id": "tests"})
+        version = meta["version"] if meta else 0
+        if self.body is None or version != self.version:
+            tests, next_cursor = await fetch_page(
+                db.tests, {"is_active": True}, DEFAULT_PAGE_SIZE, projection=TEST_SUMMARY_PROJECTION
+            )
+            self.next_cursor = next_cursor
+            self.tests = [TestResponse(**test) for test in tests]
+            self.body = self.encoder.dump_json(self.tests)
+            self.version = version
+            self.rebuilds += 1
+        self._checked_at = time.monotonic()
+
+    def mark_stale(self):
+        self._checked_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "bytes": len(self.body) if self.body is not None else 0,
+            "served": self.served,
+            "rebuilds": self.rebuilds
+        }
+
+catalog_snapshot = CatalogSnapshot(staleness_seconds=CATALOG_STALENESS_SECONDS)
+
+def dump_json(value: Any) -> bytes:
+    """Encode the way FastAPI's JSONResponse does"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+def render_take_payload(test: Dict[str, Any]) -> bytes:
+    """JSON body of GET /tests/{test_id}/take: the paper without correct answers"""
+    questions_for_student = []
+    for q in test["questions"]:
+        questions_for_student.append({
+            "id": q["id"],
+            "question_text": q["question_text"],
+            "options": q["options"]
+        })
+    
+    return dump_json({
+        "id": test["id"],
+        "title": test["title"],
+        "description": test["description"],
+        "duration_minutes": test["duration_minutes"],
+        "questions": questions_for_student
+    })
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip; "gzip;q=0" refuses it"""
+    qualities = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip()] = quality
+    # An explicit gzip entry wins over the * wildcard
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+class SolutionsTemplate:
+    """Solutions list of one test version, pre-rendered around the student's fields.
+
+    Only student_answer, student_option and is_correct differ between
+    students, and they depend on nothing but the chosen option. Each
+    question is stored as static bytes plus one fragment per possible
+    answer, so rendering is a lookup and a join.
+    """
+    __slots__ = ("static", "choices", "size")
+
+    def __init__(self, test: Dict[str, Any]):
+        self.static: List[bytes] = []
+        self.choices: List[List[bytes]] = []
+        opening = b"["
+        for i, question in enumerate(test["questions"]):
+            head = dump_json({
+                "question_number": i + 1,
+                "question_text": question["question_text"],
+                "options": question["options"],
+                "correct_answer": question["correct_answer"],
+                # Tests stored before correct_answer was validated may point past the options
+                "correct_option": (
+                    question["options"][question["correct_answer"]]
+                    if 0 <= question["correct_answer"] < len(question["options"]) else None
+                )
+            })
+            self.static.append(opening + head[:-1] + b',"student_answer":')
+            # Fragment k is for answer k - 1, so UNANSWERED is fragment 0
+            self.choices.append([
+                b"%d,\"student_option\":%s,\"is_correct\":%s" % (
+                    answer,
+                    dump_json(question["options"][answer] if answer >= 0 else "Not answered"),
+                    b"true" if answer == question["correct_answer"] else b"false"
+                )
+                for answer in range(UNANSWERED, len(question["options"]))
+            ])
+            explanation = dump_json(question.get("explanation", "No explanation provided"))
+            opening = b',"explanation":' + explanation + b"},"
+        self.static.append(opening[:-1] + b"]" if self.choices else b"[]")
+        self.size = sum(map(len, self.static)) + sum(len(fragment) for fragments in self.choices for fragment in fragments)
+
+    def render(self, answers: List[int]) -> bytes:
+        """Solutions JSON for answers already sanitised by AnswerKey.answer_matrix"""
+        parts = []
+        for static, fragments, answer in zip(self.static, self.choices, answers):
+            parts.append(static)
+            parts.append(fragments[answer + 1])
+        parts.append(self.static[-1])
+        return b"".join(parts)
+
+class TestPaper:
+    """One content version of a test, shared read-only by every request.
+
+    Student-facing payloads are rendered once per version, so serving them
+    costs no encoding work per request.
+    """
+    __slots__ = ("test", "version", "answer_key", "take_body", "take_body_gzip", "solutions", "size")
+
+    def __init__(self, test: Dict[str, Any]):
+        self.test = test
+        self.version = test.get("content_version", 1)
+        self.answer_key = AnswerKey(test)
+        self.take_body = render_take_payload(test)
+        self.take_body_gzip = gzip.compress(self.take_body)
+        self.solutions = SolutionsTemplate(test)
+        self.size = (
+            len(bson.encode(test)) + self.answer_key.nbytes
+            + len(self.take_body) + len(self.take_body_gzip) + self.solutions.size
+        )
+
+class TestPaperCache:
+    """Byte-budgeted LRU of test papers for take, submit and solutions.
+
+    Test mutations are recorded per test in db.catalog_versions; each
+    workers polls those records and drops the papers that changed. Seeing
+    a newer content_version drops the cached paper at once, and a paper
+    older than the newest version seen is never cached again.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._papers = BoundedLRU(max_bytes)  # test_id -> TestPaper, sized in bytes
+        self._min_versions: Dict[str, int] = {}  # test_id -> newest content_version seen
+        self._invalidations = 0
+        self._synced_at = datetime.now(timezone.utc)
+        self.singleflight = SingleFlight()
+
+    def require_version(self, test_id: str, version: int):
+        if version > self._min_versions.get(test_id, 0):
+            self._min_versions[test_id] = version
+            self.invalidate(test_id)
+
+    def get(self, test_id: str) -> Optional[TestPaper]:
+        return self._papers.get(test_id)
+
+    async def load(self, test_id: str) -> Optional[TestPaper]:
+        # Concurrent misses for one test share a single Mongo read
+        return await self.singleflight.do(test_id, lambda: self._load(test_id))
+
+    async def _load(self, test_id: str) -> Optional[TestPaper]:
+        invalidations = self._invalidations
+        test = await db.tests.find_one({"id": test_id}, {"_id": 0})
+        if test is None:
+            return None
+        paper = TestPaper(test)
+        # A paper read while the test was being changed may already be stale
+        current = paper.version >= self._min_versions.get(test_id, 0)
+        if current and invalidations == self._invalidations and paper.size <= self.max_bytes:
+            self._papers.put(test_id, paper, size=paper.size)
+        return paper
+
+    def invalidate(self, test_id: str):
+        # A read already in flight may return the old version
+        self.singleflight.forget(test_id)
+        self._papers.pop(test_id)
+        self._invalidations += 1
+
+    async def sync(self):
+        now = datetime.now(timezone.utc)
+        since = poll_since(self._synced_at, CATALOG_STALENESS_SECONDS)
+        async for change in db.catalog_versions.find({"updated_at": {"$gt": since}}, {"test_id": 1, "content_version": 1}):
+            if change.get("content_version"):
+                self.require_version(change["test_id"], change["content_version"])
+            self.invalidate(change["test_id"])
+        self._synced_at = now
+
+    async def run_sync_loop(self):
+        while True:
+            await asyncio.sleep(CATALOG_STALENESS_SECONDS)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Test paper cache sync failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._papers.stats(),
+            "bytes": self._papers.size,
+            "max_bytes": self.max_bytes,
+            "loads": self.singleflight.stats()
+        }
+
+test_papers = TestPaperCache(max_bytes=TEST_CACHE_MAX_BYTES)
+
+async def load_test_paper(test_id: str) -> Optional[TestPaper]:
+    """Current paper of a test through the shared cache, or None if it does not exist"""
+    paper = test_papers.get(test_id)
+    if paper is None:
+        paper = await test_papers.load(test_id)
+    return paper
+
+async def bump_catalog_version(test_id: Optional[str] = None, content_changed: bool = False) -> Optional[int]:
+    """Record a change to db.tests; call after every test mutation.
+
+    Pass content_changed when questions or answers changed: the test's
+    content_version is incremented and returned, so results can tell which
+    version of the paper they were scored against.
+    """
+    content_version = None
+    if test_id is not None and content_changed:
+        # Tests stored before content_version existed are implicitly version 1
+        await db.tests.update_one({"id": test_id, "content_version": {"$exists": False}}, {"$set": {"content_version": 1}})
+        test = await db.tests.find_one_and_update(
+            {"id": test_id},
+            {"$inc": {"content_version": 1}},
+            projection={"_id": 0, "content_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        content_version = test["content_version"] if test else None
+    
+    await db.catalog_versions.update_one({"_id": "tests"}, {"$inc": {"version": 1}}, upsert=True)
+    if test_id is not None:
+        change = {"test_id": test_id, "updated_at": datetime.now(timezone.utc)}
+        if content_version is not None:
+            change["content_version"] = content_version
+            test_papers.require_version(test_id, content_version)
+        await db.catalog_versions.update_one({"_id": f"test:{test_id}"}, {"$set": change}, upsert=True)
+        test_papers.invalidate(test_id)
+    catalog_snapshot.mark_stale()
+    return content_version
+
+# ===== RESCORING =====
+class RescoreJobs:
+    """Background jobs that re-mark every stored result of a test.
+
+    Starting a job bumps the test's content_version. Results scored against
+    an older version are streamed in batches, scored with the current answer
+    key and written back with unordered bulk writes; the next batch is read
+    while the previous one is being written. Passes repeat until no stale
+    result is left, so results submitted by workers still holding the old
+    paper, and edits made while the job runs, are re-marked too. Scoring runs on a dedicated
+    thread so a large job does not stall requests on the event loop.
+    Progress lives in db.rescore_jobs so any worker can report it.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescore")
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def stale_results(test_id: str, content_version: int) -> Dict[str, Any]:
+        """Results of a test scored against an older paper"""
+        return {"test_id": test_id, "$or": [
+            {"content_version": {"$lt": content_version}},
+            {"content_version": {"$exists": False}}
+        ]}
+
+    async def start(self, test_id: str, admin_id: str, join_running: bool = False) -> Dict[str, Any]:
+        """Start re-marking a test, or with join_running return the job already running"""
+        now = datetime.now(timezone.utc)
+        # A worker that crashed or was killed mid-job stops heartbeating
+        await db.rescore_jobs.update_many(
+            {
+                "test_id": test_id,
+                "status": "running",
+                "updated_at": {"$lt": now - timedelta(seconds=RESCORE_JOB_STALE_SECONDS)}
+            },
+            {"$set": {"status": "failed", "error": "Worker stopped responding", "finished_at": now}}
+        )
+        # Re-read the test so a fix made directly in Mongo is picked up; a
+        # job already running sees the new version on its next pass
+        content_version = await bump_catalog_version(test_id, content_changed=True)
+        job = {
+            "id": str(uuid.uuid4()),
+            "test_id": test_id,
+            "started_by": admin_id,
+            "status": "running",
+            "content_version": content_version,
+            "total": await db.test_results.count_documents(self.stale_results(test_id, content_version)),
+            "processed": 0,
+            "updated": 0,
+            "results_per_second": 0.0,
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "error": None
+        }
+        try:
+            # Unique among running jobs of a test, see ensure_indexes
+            await db.rescore_jobs.insert_one(dict(job))
+        except DuplicateKeyError:
+            running = await db.rescore_jobs.find_one({"test_id": test_id, "status": "running"}, {"_id": 0})
+            if running and join_running:
+                return running
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Re-score job {running['id'] if running else ''} is already running for this test"
+            )
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(RESCORE_HEARTBEAT_SECONDS)
+            await db.rescore_jobs.update_one(
+                {"id": job_id, "status": "running"},
+                {"$set": {"updated_at": datetime.now(timezone.utc)}}
+            )
+
+    async def _run(self, job: Dict[str, Any]):
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            version = None
+            while True:
+                test = await db.tests.find_one({"id": job["test_id"]}, {"_id": 0, "content_version": 1})
+                if test is None:
+                    raise ValueError("Test not found")
+                if test.get("content_version", 1) != version:
+                    version = test.get("content_version", 1)
+                    test_papers.require_version(job["test_id"], version)
+                    # Workers that have not synced the new version yet can
+                    # still submit results scored against the old paper
+                    settle_at = time.monotonic() + 2 * CATALOG_STALENESS_SECONDS
+                paper = await load_test_paper(job["test_id"])
+                if paper is None:
+                    raise ValueError("Test not found")
+                
+                if not await self._rescore_pass(job, paper, started):
+                    if time.monotonic() >= settle_at:
+                        break
+                    await asyncio.sleep(CATALOG_STALENESS_SECONDS)
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Re-score job {job['id']} failed: {str(e)}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            heartbeat.cancel()
+            job["finished_at"] = datetime.now(timezone.utc)
+            await db.rescore_jobs.update_one({"id": job["id"]}, {"$set": {
+                "status": job["status"],
+                "error": job["error"],
+                "updated_at": job["finished_at"],
+                "finished_at": job["finished_at"]
+            }})
+
+    async def _rescore_pass(self, job: Dict[str, Any], paper: TestPaper, started: float) -> int:
+        """Re-mark the results scored before paper.version; returns how many were read"""
+        query = self.stale_results(job["test_id"], paper.version)
+        job["content_version"] = paper.version
+        job["total"] = job["processed"] + await db.test_results.count_documents(query)
+        read = 0
+        writing = None
+        batch = []
+        try:
+            async for result in db.test_results.find(query, {"_id": 1, "answers": 1}).batch_size(self.batch_size):
+                read += 1
+                batch.append(result)
+                if len(batch) == self.batch_size:
+                    if writing:
+                        await self._record(job, await writing, started)
+                    writing = asyncio.create_task(self._write(paper, batch))
+                    batch = []
+            if writing:
+                await self._record(job, await writing, started)
+            if batch:
+                await self._record(job, await self._write(paper, batch), started)
+        finally:
+            # A failed read or a cancelled job must not leave a bulk write behind
+            if writing and not writing.done():
+                writing.cancel()
+                await asyncio.gather(writing, return_exceptions=True)
+        return read
+
+    # Rows per NumPy call on the scoring thread; each call holds the GIL
+    SCORE_CHUNK = 500
+
+    @classmethod
+    def _score(cls, paper: TestPaper, batch: List[Dict[str, Any]]) -> List[UpdateOne]:
+        operations = []
+        for offset in range(0, len(batch), cls.SCORE_CHUNK):
+            chunk = batch[offset:offset + cls.SCORE_CHUNK]
+            sheet = paper.answer_key.score_batch([unpack_answers(result.get("answers", [])) for result in chunk])
+            operations.extend(
+                UpdateOne({"_id": result["_id"]}, {"$set": {**fields, "content_version": paper.version}})
+                for result, fields in zip(chunk, sheet.rows())
+            )
+        return operations
+
+    async def _write(self, paper: TestPaper, batch: List[Dict[str, Any]]) -> tuple:
+        loop = asyncio.get_running_loop()
+        operations = await loop.run_in_executor(self.executor, self._score, paper, batch)
+        written = await db.test_results.bulk_write(operations, ordered=False)
+        return len(batch), written.modified_count
+
+    async def _record(self, job: Dict[str, Any], written: tuple, started: float):
+        job["processed"] += written[0]
+        job["updated"] += written[1]
+        job["results_per_second"] = round(job["processed"] / (time.perf_counter() - started), 1)
+        await db.rescore_jobs.update_one({"id": job["id"]}, {"$set": {
+            "content_version": job["content_version"],
+            "total": job["total"],
+            "processed": job["processed"],
+            "updated": job["updated"],
+            "results_per_second": job["results_per_second"],
+            "updated_at": datetime.now(timezone.utc)
+        }})
+
+    async def shutdown(self):
+        """Cancel running jobs and wait until each has recorded its status"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": len(self._tasks), "batch_size": self.batch_size}
+
+rescore_jobs = RescoreJobs(batch_size=RESCORE_BATCH_SIZE)
+
 # ===== ADMIN ROUTES =====
 @api_router.post("/admin/tests", response_model=TestResponse)
-async def create_test(test: TestCreate, admin: User = Depends(require_admin)):
+async def create_test(test: TestCreate, admin: AuthPrincipal = Depends(require_admin)):
     # Convert questions
     questions = [Question(**q.dict()) for q in test.questions]
     
     new_test = Test(
         **test.dict(exclude={"questions"}),
         questions=questions,
+        questions_count=len(questions),
         created_by=admin.id
     )
     
     await db.tests.insert_one(new_test.dict())
+    await bump_catalog_version(new_test.id)
     
-    return TestResponse(
-        **new_test.dict(),
-        questions_count=len(new_test.questions)
-    )
+    return TestResponse(**new_test.dict())
 
 @api_router.get("/admin/tests", response_model=List[TestResponse])
-async def get_admin_tests(admin: User = Depends(require_admin)):
-    tests = await db.tests.find({"created_by": admin.id}).to_list(1000)
-    return [TestResponse(**test, questions_count=len(test["questions"])) for test in tests]
+async def get_admin_tests(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: AuthPrincipal = Depends(require_admin)
+):
+    tests, next_cursor = await fetch_page(
+        db.tests, {"created_by": admin.id}, limit, cursor, projection=TEST_SUMMARY_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return [TestResponse(**test) for test in tests]
 
 @api_router.delete("/admin/tests/{test_id}")
-async def delete_test(test_id: str, admin: User = Depends(require_admin)):
+async def delete_test(test_id: str, admin: AuthPrincipal = Depends(require_admin)):
     """Delete a test created by the admin"""
     # Check if test exists and belongs to the admin
     test = await db.tests.find_one({"id": test_id, "created_by": admin.id})
@@ -773,16 +2440,83 @@ async def delete_test(test_id: str, admin: User = Depends(require_admin)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test not found"
         )
+    await bump_catalog_version(test_id)
     
     return {"message": "Test deleted successfully"}
 
+@api_router.post("/admin/tests/{test_id}/rescore", status_code=status.HTTP_202_ACCEPTED)
+async def rescore_test(test_id: str, admin: AuthPrincipal = Depends(require_admin)):
+    """Re-mark every stored result of a test against its current answer key"""
+    test = await db.tests.find_one({"id": test_id, "created_by": admin.id}, {"_id": 1})
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found or you don't have permission to re-score it"
+        )
+    
+    return await rescore_jobs.start(test_id, admin.id)
+
+@api_router.put("/admin/tests/{test_id}/questions/{question_id}/answer", status_code=status.HTTP_202_ACCEPTED)
+async def correct_answer_key(
+    test_id: str,
+    question_id: str,
+    fix: AnswerKeyUpdate,
+    admin: AuthPrincipal = Depends(require_admin)
+):
+    """Correct a question's answer and re-mark every result scored against the old key"""
+    test = await db.tests.find_one(
+        {"id": test_id, "created_by": admin.id},
+        {"_id": 0, "questions.id": 1, "questions.options": 1}
+    )
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found or you don't have permission to edit it"
+        )
+    
+    question = next((q for q in test["questions"] if q["id"] == question_id), None)
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    if fix.correct_answer >= len(question["options"]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"correct_answer must be an option index from 0 to {len(question['options']) - 1}"
+        )
+    
+    changes = {"questions.$.correct_answer": fix.correct_answer}
+    if fix.explanation is not None:
+        changes["questions.$.explanation"] = fix.explanation
+    await db.tests.update_one({"id": test_id, "questions.id": question_id}, {"$set": changes})
+    
+    # Bumps content_version; a job already running re-marks against it too
+    return await rescore_jobs.start(test_id, admin.id, join_running=True)
+
+@api_router.get("/admin/rescore-jobs/{job_id}")
+async def get_rescore_job(job_id: str, admin: AuthPrincipal = Depends(require_admin)):
+    """Progress and throughput of a re-score job"""
+    job = await db.rescore_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Re-score job not found")
+    
+    job["percent"] = round(job["processed"] / job["total"] * 100, 2) if job["total"] else 100.0
+    return job
+
 @api_router.get("/admin/students", response_model=List[UserResponse])
-async def get_students(admin: User = Depends(require_admin)):
-    students = await db.users.find({"role": UserRole.STUDENT}).to_list(1000)
+async def get_students(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: AuthPrincipal = Depends(require_admin)
+):
+    students, next_cursor = await fetch_page(
+        db.users, {"role": UserRole.STUDENT}, limit, cursor,
+        projection={"id": 1, "email": 1, "name": 1, "role": 1, "is_active": 1}
+    )
+    set_next_cursor(response, next_cursor)
     return [UserResponse(**student) for student in students]
 
 @api_router.get("/admin/bulk-upload-format")
-async def get_bulk_upload_format(admin: User = Depends(require_admin)):
+async def get_bulk_upload_format(admin: AuthPrincipal = Depends(require_admin)):
     """Get the format requirements for bulk question upload"""
     return {
         "message": "Excel file format for bulk question upload",
@@ -795,6 +2529,9 @@ async def get_bulk_upload_format(admin: User = Depends(require_admin)):
             "correct_answer",
             "explanation"
         ],
+        "optional_columns": [
+            "section"
+        ],
         "format_rules": [
             "Save file as .xlsx format",
             "First row should contain column headers exactly as shown above",
@@ -802,8 +2539,9 @@ async def get_bulk_upload_format(admin: User = Depends(require_admin)):
             "option_a, option_b, option_c, option_d: The four answer options", 
             "correct_answer: Must be 'A', 'B', 'C', or 'D' (case insensitive)",
             "explanation: Detailed solution explanation for the question",
+            "section: Optional section name, e.g. 'Polity'; used for sectional scores and weights",
             "Maximum 120 questions per upload",
-            "All fields are required - no empty cells allowed"
+            "All required fields must be filled - no empty cells allowed"
         ],
         "sample_data": {
             "question_text": "What is the capital of India?",
@@ -819,7 +2557,7 @@ async def get_bulk_upload_format(admin: User = Depends(require_admin)):
 @api_router.post("/admin/bulk-upload-questions")
 async def bulk_upload_questions(
     file: UploadFile = File(...),
-    admin: User = Depends(require_admin)
+    admin: AuthPrincipal = Depends(require_admin)
 ):
     """Upload questions in bulk from Excel file"""
     
@@ -865,7 +2603,7 @@ async def bulk_upload_questions(
         for index, row in df.iterrows():
             try:
                 # Check for empty cells
-                if row.isna().any():
+                if row[required_columns].isna().any():
                     errors.append(f"Row {index + 2}: Contains empty cells")
                     continue
                 
@@ -888,7 +2626,8 @@ async def bulk_upload_questions(
                         str(row['option_d']).strip()
                     ],
                     correct_answer=correct_index,
-                    explanation=str(row['explanation']).strip()
+                    explanation=str(row['explanation']).strip(),
+                    section=str(row['section']).strip() if 'section' in df.columns and not pd.isna(row['section']) else None
                 )
                 questions.append(question)
                 
@@ -924,12 +2663,30 @@ async def bulk_upload_questions(
 
 # ===== STUDENT ROUTES =====
 @api_router.get("/tests", response_model=List[TestResponse])
-async def get_available_tests():
-    tests = await db.tests.find({"is_active": True}).to_list(1000)
-    return [TestResponse(**test, questions_count=len(test["questions"])) for test in tests]
+async def get_available_tests(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    if cursor is None and limit == DEFAULT_PAGE_SIZE:
+        # Identical for every student: serve the shared pre-encoded first page
+        version, body, next_cursor, _ = await catalog_snapshot.get()
+        headers = {"ETag": f'"catalog-{version}"'}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    tests, next_cursor = await fetch_page(
+        db.tests, {"is_active": True}, limit, cursor, projection=TEST_SUMMARY_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return [TestResponse(**test) for test in tests]
 
 @api_router.post("/tests/{test_id}/purchase")
-async def purchase_test(test_id: str, current_user: User = Depends(get_current_user_flexible)):
+async def purchase_test(test_id: str, current_user: AuthPrincipal = Depends(get_current_user_flexible)):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can purchase tests")
     
@@ -993,7 +2750,7 @@ async def purchase_test(test_id: str, current_user: User = Depends(get_current_u
 @api_router.post("/verify-payment")
 async def verify_payment(
     verification: PaymentVerification,
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_user)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can verify payments")
@@ -1051,129 +2808,199 @@ async def verify_payment(
             detail="Payment verification failed"
         )
 
+async def list_purchased_tests(student_id: str, limit: int, cursor: Optional[str] = None):
+    """One page of a student's purchased tests and the next page's cursor.
+
+    Purchases are joined to test summaries in the same aggregation, so a
+    page is a single round trip that never returns question arrays.
+    """
+    purchases, next_cursor = await fetch_page(
+        db.purchases,
+        {"student_id": student_id, "status": "completed"},
+        limit, cursor,
+        # An equality $lookup uses the tests.id index on every server
+        # version; questions are dropped by the projection below
+        stages=[
+            {"$lookup": {"from": "tests", "localField": "test_id", "foreignField": "id", "as": "test"}},
+            {"$unwind": {"path": "$test", "preserveNullAndEmptyArrays": True}}
+        ],
+        projection=PURCHASED_TEST_PROJECTION
+    )
+    
+    tests = {}
+    for purchase in purchases:
+        # Deleted tests drop out; a test bought twice is listed once
+        test = purchase.get("test")
+        if test and "id" in test and test["id"] not in tests:
+            tests[test["id"]] = TestResponse(**test)
+    
+    return list(tests.values()), next_cursor
+
 @api_router.get("/my-tests", response_model=List[TestResponse])
-async def get_purchased_tests(current_user: User = Depends(get_current_user)):
+async def get_purchased_tests(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: AuthPrincipal = Depends(get_current_user)
+):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can view purchased tests")
     
-    purchases = await db.purchases.find({
-        "student_id": current_user.id,
-        "status": "completed"
-    }).to_list(1000)
-    
-    test_ids = [p["test_id"] for p in purchases]
-    tests = await db.tests.find({"id": {"$in": test_ids}}).to_list(1000)
-    
-    return [TestResponse(**test, questions_count=len(test["questions"])) for test in tests]
+    tests, next_cursor = await list_purchased_tests(current_user.id, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return tests
 
 @api_router.get("/tests/{test_id}/take")
-async def get_test_for_taking(test_id: str, current_user: User = Depends(get_current_user)):
+async def get_test_for_taking(test_id: str, request: Request, current_user: AuthPrincipal = Depends(get_current_user)):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can take tests")
     
+    # The three lookups are independent, so they run concurrently;
+    # errors are still raised in the order the checks are listed
+    purchase, result, paper = await asyncio.gather(
+        db.purchases.find_one({
+            "student_id": current_user.id,
+            "test_id": test_id,
+            "status": "completed"
+        }, {"_id": 1}),
+        db.test_results.find_one({
+            "student_id": current_user.id,
+            "test_id": test_id
+        }, {"_id": 1}),
+        load_test_paper(test_id)
+    )
+    
     # Check if purchased
-    purchase = await db.purchases.find_one({
-        "student_id": current_user.id,
-        "test_id": test_id,
-        "status": "completed"
-    })
     if not purchase:
         raise HTTPException(status_code=403, detail="Test not purchased")
     
     # Check if already taken
-    result = await db.test_results.find_one({
-        "student_id": current_user.id,
-        "test_id": test_id
-    })
     if result:
         raise HTTPException(status_code=400, detail="Test already completed")
     
-    test = await db.tests.find_one({"id": test_id})
-    if not test:
+    if not paper:
         raise HTTPException(status_code=404, detail="Test not found")
     
-    # Return test without correct answers
-    questions_for_student = []
-    for q in test["questions"]:
-        questions_for_student.append({
-            "id": q["id"],
-            "question_text": q["question_text"],
-            "options": q["options"]
-        })
-    
-    return {
-        "id": test["id"],
-        "title": test["title"],
-        "description": test["description"],
-        "duration_minutes": test["duration_minutes"],
-        "questions": questions_for_student
-    }
+    # Return the pre-rendered paper without correct answers
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        return Response(
+            content=paper.take_body_gzip,
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return Response(content=paper.take_body, media_type="application/json", headers={"Vary": "Accept-Encoding"})
 
 @api_router.post("/tests/{test_id}/submit")
 async def submit_test(
     test_id: str, 
     answers: Dict[str, Any], 
-    current_user: User = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_user)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can submit tests")
     
-    test = await db.tests.find_one({"id": test_id})
-    if not test:
+    paper = await load_test_paper(test_id)
+    if not paper:
         raise HTTPException(status_code=404, detail="Test not found")
     
     # Calculate score
-    student_answers = answers["answers"]  # List of selected options
-    correct_count = 0
-    
-    for i, question in enumerate(test["questions"]):
-        if i < len(student_answers) and student_answers[i] == question["correct_answer"]:
-            correct_count += 1
+    # One key-length row; out-of-range options become UNANSWERED
+    student_answers = paper.answer_key.answer_matrix([answers["answers"]])
+    scored = paper.answer_key.score_matrix(student_answers).rows()[0]
+    student_answers = student_answers[0].tolist()
     
     result = TestResult(
         student_id=current_user.id,
         test_id=test_id,
         answers=student_answers,
-        score=correct_count,
-        total_questions=len(test["questions"]),
-        time_taken_minutes=answers.get("time_taken_minutes", 0)
+        time_taken_minutes=answers.get("time_taken_minutes", 0),
+        content_version=paper.version,
+        **scored
     )
     
-    await db.test_results.insert_one(result.dict())
+    await db.test_results.insert_one({**result.dict(), "answers": pack_answers(result.answers)})
     
     return {
-        "score": correct_count,
-        "total_questions": len(test["questions"]),
-        "percentage": round((correct_count / len(test["questions"])) * 100, 2)
+        "score": result.score,
+        "max_score": result.max_score,
+        "total_questions": result.total_questions,
+        "percentage": result_percentage(result.dict()),
+        "correct_count": result.correct_count,
+        "wrong_count": result.wrong_count,
+        "unattempted_count": result.unattempted_count,
+        "sections": result.sections
     }
 
-@api_router.get("/my-results", response_model=List[Dict])
-async def get_my_results(current_user: User = Depends(get_current_user)):
-    if current_user.role != UserRole.STUDENT:
-        raise HTTPException(status_code=403, detail="Only students can view results")
+async def list_results(student_id: str, limit: int, cursor: Optional[str] = None):
+    """One page of a student's results with test titles, and the next page's cursor"""
+    results, next_cursor = await fetch_page(
+        db.test_results, {"student_id": student_id}, limit, cursor, projection={"answers": 0}
+    )
     
-    results = await db.test_results.find({"student_id": current_user.id}).to_list(1000)
+    # Get test titles for the whole page in one query
+    test_ids = list({result["test_id"] for result in results})
+    titles = {
+        test["id"]: test["title"]
+        async for test in db.tests.find({"id": {"$in": test_ids}}, {"_id": 0, "id": 1, "title": 1})
+    }
     
-    # Get test details for each result
     enriched_results = []
     for result in results:
-        test = await db.tests.find_one({"id": result["test_id"]})
-        if test:
+        if result["test_id"] in titles:
             enriched_results.append({
                 "id": result["id"],
                 "test_id": result["test_id"],
-                "test_title": test["title"],
+                "test_title": titles[result["test_id"]],
                 "score": result["score"],
+                "max_score": result.get("max_score") or result["total_questions"],
                 "total_questions": result["total_questions"],
-                "percentage": round((result["score"] / result["total_questions"]) * 100, 2),
+                "percentage": result_percentage(result),
                 "completed_at": result["completed_at"],
-                "time_taken_minutes": result.get("time_taken_minutes", 0)
+                "time_taken_minutes": result.get("time_taken_minutes", 0),
+                "sections": result.get("sections", [])
             })
     
-    return enriched_results
+    return enriched_results, next_cursor
+
+@api_router.get("/my-results", response_model=List[Dict])
+async def get_my_results(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: AuthPrincipal = Depends(get_current_user)
+):
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=403, detail="Only students can view results")
+    
+    results, next_cursor = await list_results(current_user.id, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return results
+
+@api_router.get("/dashboard")
+async def get_dashboard(current_user: AuthPrincipal = Depends(get_current_user)):
+    """First page of the catalog, purchased tests and results in one round trip"""
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=403, detail="Only students can view the dashboard")
+    
+    (_, _, catalog_cursor, catalog), (purchased, purchased_cursor), (results, results_cursor) = await asyncio.gather(
+        catalog_snapshot.get(),
+        list_purchased_tests(current_user.id, DEFAULT_PAGE_SIZE),
+        list_results(current_user.id, DEFAULT_PAGE_SIZE)
+    )
+    
+    return {
+        "available_tests": catalog,
+        "purchased_tests": purchased,
+        "results": results,
+        "next_cursors": {
+            "available_tests": catalog_cursor,
+            "purchased_tests": purchased_cursor,
+            "results": results_cursor
+        }
+    }
 
 @api_router.get("/test-solutions/{test_id}")
-async def get_test_solutions(test_id: str, current_user: User = Depends(get_current_user)):
+async def get_test_solutions(test_id: str, current_user: AuthPrincipal = Depends(get_current_user)):
     """Get test solutions and explanations after completing the test"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can view solutions")
@@ -1191,43 +3018,30 @@ async def get_test_solutions(test_id: str, current_user: User = Depends(get_curr
         )
     
     # Get test with questions and solutions
-    test = await db.tests.find_one({"id": test_id})
-    if not test:
+    paper = await load_test_paper(test_id)
+    if not paper:
         raise HTTPException(status_code=404, detail="Test not found")
     
-    # Prepare solutions with student's answers
-    solutions = []
-    student_answers = result.get("answers", [])
+    # Merge the student's answers into the pre-rendered solutions
+    student_answers = paper.answer_key.answer_matrix([unpack_answers(result.get("answers", []))])
+    solutions = paper.solutions.render(student_answers[0].tolist())
     
-    for i, question in enumerate(test["questions"]):
-        student_answer = student_answers[i] if i < len(student_answers) else -1
-        is_correct = student_answer == question["correct_answer"]
-        
-        solutions.append({
-            "question_number": i + 1,
-            "question_text": question["question_text"],
-            "options": question["options"],
-            "correct_answer": question["correct_answer"],
-            "correct_option": question["options"][question["correct_answer"]],
-            "student_answer": student_answer,
-            "student_option": question["options"][student_answer] if 0 <= student_answer < len(question["options"]) else "Not answered",
-            "is_correct": is_correct,
-            "explanation": question.get("explanation", "No explanation provided")
-        })
-    
-    return {
+    summary = dump_json(jsonable_encoder({
         "test_id": test_id,
-        "test_title": test["title"],
+        "test_title": paper.test["title"],
         "student_score": result["score"],
+        "max_score": result.get("max_score") or result["total_questions"],
         "total_questions": result["total_questions"],
-        "percentage": round((result["score"] / result["total_questions"]) * 100, 2),
+        "percentage": result_percentage(result),
+        "correct_count": result.get("correct_count", int(paper.answer_key.matches(student_answers).sum())),
         "completed_at": result["completed_at"],
-        "solutions": solutions
-    }
+        "sections": result.get("sections", [])
+    }))
+    return Response(content=summary[:-1] + b',"solutions":' + solutions + b"}", media_type="application/json")
 
 # ===== CART ROUTES =====
 @api_router.get("/cart", response_model=CartResponse)
-async def get_cart(current_user: User = Depends(get_current_user)):
+async def get_cart(current_user: AuthPrincipal = Depends(get_current_user)):
     """Get student's current cart"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can access cart")
@@ -1255,7 +3069,7 @@ async def get_cart(current_user: User = Depends(get_current_user)):
     )
 
 @api_router.post("/cart/add")
-async def add_to_cart(request: AddToCartRequest, current_user: User = Depends(get_current_user)):
+async def add_to_cart(request: AddToCartRequest, current_user: AuthPrincipal = Depends(get_current_user)):
     """Add a test to cart"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can add to cart")
@@ -1312,7 +3126,7 @@ async def add_to_cart(request: AddToCartRequest, current_user: User = Depends(ge
     return {"message": "Test added to cart successfully"}
 
 @api_router.delete("/cart/remove/{test_id}")
-async def remove_from_cart(test_id: str, current_user: User = Depends(get_current_user)):
+async def remove_from_cart(test_id: str, current_user: AuthPrincipal = Depends(get_current_user)):
     """Remove a test from cart"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can modify cart")
@@ -1342,7 +3156,7 @@ async def remove_from_cart(test_id: str, current_user: User = Depends(get_curren
     return {"message": "Test removed from cart successfully"}
 
 @api_router.delete("/cart/clear")
-async def clear_cart(current_user: User = Depends(get_current_user)):
+async def clear_cart(current_user: AuthPrincipal = Depends(get_current_user)):
     """Clear all items from cart"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can modify cart")
@@ -1360,7 +3174,7 @@ async def clear_cart(current_user: User = Depends(get_current_user)):
     return {"message": "Cart cleared successfully"}
 
 @api_router.post("/cart/checkout")
-async def checkout_cart(current_user: User = Depends(get_current_user)):
+async def checkout_cart(current_user: AuthPrincipal = Depends(get_current_user)):
     """Create Razorpay order for cart checkout"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can checkout")
@@ -1420,7 +3234,7 @@ async def checkout_cart(current_user: User = Depends(get_current_user)):
         )
 
 @api_router.post("/cart/verify-payment")
-async def verify_cart_payment(verification: PaymentVerification, current_user: User = Depends(get_current_user)):
+async def verify_cart_payment(verification: PaymentVerification, current_user: AuthPrincipal = Depends(get_current_user)):
     """Verify cart payment and complete bundle purchase"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Only students can verify payments")
@@ -1525,6 +3339,21 @@ async def debug_users():
         })
     return {"users": result, "count": len(result)}
 
+@api_router.get("/admin/metrics")
+async def get_metrics(admin: AuthPrincipal = Depends(require_admin)):
+    """In-process performance counters for this worker"""
+    return {
+        "jwt_cache": decoded_tokens.stats(),
+        "user_cache": user_cache.stats(),
+        "catalog_snapshot": catalog_snapshot.stats(),
+        "test_papers": test_papers.stats(),
+        "session_cache": session_cache.stats(),
+        "password_service": password_service.stats(),
+        "login_admission": login_admission.stats(),
+        "emergent_auth": emergent_auth_client.stats(),
+        "rescore_jobs": rescore_jobs.stats()
+    }
+
 # ===== BASIC ROUTES =====
 @api_router.get("/")
 async def root():
@@ -1539,6 +3368,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Configure logging
@@ -1560,6 +3390,54 @@ else:
     razorpay_client = None
     logger.warning("Razorpay credentials not configured")
 
+@app.on_event("startup")
+async def ensure_indexes():
+    try:
+        await db.refresh_tokens.create_index("id", unique=True)
+        await db.refresh_tokens.create_index("user_id")
+        await db.refresh_tokens.create_index("expires_at", expireAfterSeconds=0)
+        await db.users.create_index("id")
+        await db.users.create_index("email")
+        # Polled by TokenEpochTable.sync; only users whose tokens were revoked have it
+        await db.users.create_index("token_epoch_changed_at", sparse=True)
+        await db.sessions.create_index("session_token")
+        # Keyset pagination walks these in _id order
+        await db.tests.create_index([("is_active", 1), ("_id", 1)])
+        await db.tests.create_index([("created_by", 1), ("_id", 1)])
+        await db.tests.create_index("id")
+        await db.catalog_versions.create_index("updated_at")
+        await db.users.create_index([("role", 1), ("_id", 1)])
+        await db.purchases.create_index([("student_id", 1), ("status", 1), ("_id", 1)])
+        await db.test_results.create_index([("student_id", 1), ("_id", 1)])
+        # Purchase and existing-result checks of take, submit and solutions
+        await db.purchases.create_index([("student_id", 1), ("test_id", 1)])
+        await db.test_results.create_index([("student_id", 1), ("test_id", 1)])
+        await db.test_results.create_index("test_id")
+        await db.rescore_jobs.create_index("id")
+        await db.rescore_jobs.create_index(
+            "test_id", unique=True, partialFilterExpression={"status": "running"}, name="one_running_job_per_test"
+        )
+    except Exception as e:
+        logger.error(f"Error creating indexes: {str(e)}")
+
+@app.on_event("startup")
+async def calibrate_password_hashing():
+    await password_service.calibrate()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.background_tasks = [
+        asyncio.create_task(token_epochs.run_sync_loop()),
+        asyncio.create_task(watch_user_changes()),
+        asyncio.create_task(watch_session_changes()),
+        asyncio.create_task(test_papers.run_sync_loop()),
+    ]
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in app.state.background_tasks:
+        task.cancel()
+    await rescore_jobs.shutdown()
+    password_service.executor.shutdown(wait=False)
+    await emergent_auth_client.close()
     client.close()
\ No newline at end of file
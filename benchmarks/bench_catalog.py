@@ -0,0 +1,92 @@
+"""Bytes and latency of catalog queries: full test documents vs projected summaries.
+
+Seeds a scratch database on MONGO_URL with 120-question tests, then runs the
+catalog query the list endpoints used to run (whole documents, counted in
+Python) against test_summary_pipeline (projected, counted server-side).
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_catalog.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import test_summary_pipeline  # noqa: E402
+
+TESTS = int(os.environ.get('BENCH_TESTS', 50))
+QUESTIONS = 120
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 50))
+
+
+def make_test():
+    return {
+        "id": str(uuid.uuid4()),
+        "title": "UPSC Prelims Mock",
+        "description": "General Studies Paper I",
+        "price": 199.0,
+        "duration_minutes": 120,
+        "questions": [
+            {
+                "id": str(uuid.uuid4()),
+                "question_text": "Consider the following statements about the Constitution. " * 4,
+                "options": ["Only 1", "Only 2", "Both 1 and 2", "Neither 1 nor 2"],
+                "correct_answer": 2,
+                "explanation": "Detailed explanation of the correct option and distractors. " * 8,
+            }
+            for _ in range(QUESTIONS)
+        ],
+        "created_by": "bench-admin",
+        "created_at": datetime.now(timezone.utc),
+        "is_active": True,
+        "questions_count": QUESTIONS,
+    }
+
+
+async def timed(query):
+    samples = []
+    payload = 0
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        docs = await query()
+        samples.append((time.perf_counter() - started) * 1000)
+        payload = sum(len(bson.encode(doc)) for doc in docs)
+    return statistics.median(samples), payload
+
+
+async def main():
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[f"bench_catalog_{uuid.uuid4().hex[:8]}"]
+    try:
+        await db.tests.insert_many([make_test() for _ in range(TESTS)])
+
+        async def full_documents():
+            tests = await db.tests.find({"is_active": True}).to_list(1000)
+            for test in tests:
+                test["questions_count"] = len(test["questions"])
+            return tests
+
+        async def summaries():
+            return await db.tests.aggregate(test_summary_pipeline({"is_active": True})).to_list(1000)
+
+        full_ms, full_bytes = await timed(full_documents)
+        summary_ms, summary_bytes = await timed(summaries)
+        print(f"{TESTS} tests x {QUESTIONS} questions, median of {ROUNDS} rounds")
+        print(f"{'query':<18}{'p50 ms':>10}{'payload bytes':>16}")
+        print(f"{'full documents':<18}{full_ms:>10.2f}{full_bytes:>16}")
+        print(f"{'projected':<18}{summary_ms:>10.2f}{summary_bytes:>16}")
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
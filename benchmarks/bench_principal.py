@@ -0,0 +1,72 @@
+"""Per-request cost of the auth principal: full User model vs AuthPrincipal.
+
+Builds the object every authenticated request used to build (User validated
+from a raw Mongo document) and the ones it builds now (AuthPrincipal from
+signed claims or a projected document), reporting CPU time and allocated
+bytes per request.
+
+    python benchmarks/bench_principal.py
+"""
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import AuthPrincipal, User, PRINCIPAL_PROJECTION  # noqa: E402
+
+ITERATIONS = 100_000
+
+RAW_USER = {
+    "_id": "65f0c0ffee0000000000beef",
+    "id": str(uuid.uuid4()),
+    "email": "aspirant@example.com",
+    "name": "UPSC Aspirant",
+    "role": "student",
+    "password": "$2b$12$" + "x" * 53,
+    "created_at": datetime.now(timezone.utc),
+    "is_active": True,
+    "token_epoch": 0,
+}
+PROJECTED_USER = {key: value for key, value in RAW_USER.items() if PRINCIPAL_PROJECTION.get(key)}
+CLAIMS = {"uid": RAW_USER["id"], "sub": RAW_USER["email"], "name": RAW_USER["name"], "role": "student"}
+
+
+def full_user():
+    return User(**RAW_USER)
+
+
+def principal_from_document():
+    return AuthPrincipal.from_document(PROJECTED_USER)
+
+
+def principal_from_claims():
+    return AuthPrincipal(CLAIMS["uid"], CLAIMS["sub"], CLAIMS["name"], CLAIMS["role"])
+
+
+def measure(func):
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    cpu_us = (time.perf_counter() - started) / ITERATIONS * 1e6
+
+    tracemalloc.start()
+    kept = [func() for _ in range(1000)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return cpu_us, allocated / 1000
+
+
+if __name__ == "__main__":
+    print(f"{'variant':<28}{'us/request':>12}{'bytes/request':>16}")
+    for name, func in [
+        ("User(**raw document)", full_user),
+        ("AuthPrincipal (projected)", principal_from_document),
+        ("AuthPrincipal (claims)", principal_from_claims),
+    ]:
+        cpu_us, allocated = measure(func)
+        print(f"{name:<28}{cpu_us:>12.2f}{allocated:>16.0f}")
@@ -0,0 +1,99 @@
+"""Latency of the take preconditions: sequential awaits vs concurrent.
+
+Seeds a scratch database on MONGO_URL with one 120-question test, a
+completed purchase and no result, then times the purchase check, the
+existing-result check and the test fetch run one after another (as
+get_test_for_taking used to) and under asyncio.gather (as it does now).
+The test fetch bypasses the paper cache so every round reads Mongo.
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_take.py
+"""
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+QUESTIONS = 120
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 1000))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def timed(query):
+    samples = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        await query()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), percentile(samples, 0.99)
+
+
+async def main():
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[f"bench_take_{uuid.uuid4().hex[:8]}"]
+    student_id = str(uuid.uuid4())
+    test_id = str(uuid.uuid4())
+    try:
+        await db.tests.insert_one({
+            "id": test_id,
+            "title": "UPSC Prelims Mock",
+            "description": "General Studies Paper I",
+            "duration_minutes": 120,
+            "questions": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "question_text": "Consider the following statements about the Constitution. " * 4,
+                    "options": ["Only 1", "Only 2", "Both 1 and 2", "Neither 1 nor 2"],
+                    "correct_answer": 2,
+                    "explanation": "Detailed explanation of the correct option and distractors. " * 8,
+                }
+                for _ in range(QUESTIONS)
+            ],
+            "is_active": True,
+        })
+        await db.purchases.insert_one({
+            "student_id": student_id,
+            "test_id": test_id,
+            "status": "completed",
+            "created_at": datetime.now(timezone.utc),
+        })
+        # The indexes ensure_indexes creates for these lookups
+        await db.purchases.create_index([("student_id", 1), ("test_id", 1)])
+        await db.test_results.create_index([("student_id", 1), ("test_id", 1)])
+        await db.tests.create_index("id")
+
+        def lookups():
+            return (
+                db.purchases.find_one({"student_id": student_id, "test_id": test_id, "status": "completed"}, {"_id": 1}),
+                db.test_results.find_one({"student_id": student_id, "test_id": test_id}, {"_id": 1}),
+                db.tests.find_one({"id": test_id}, {"_id": 0}),
+            )
+
+        async def sequential():
+            for lookup in lookups():
+                await lookup
+
+        async def concurrent():
+            await asyncio.gather(*lookups())
+
+        await timed(concurrent)  # warm up connections and caches
+        seq_p50, seq_p99 = await timed(sequential)
+        con_p50, con_p99 = await timed(concurrent)
+        print(f"3 take preconditions, {ROUNDS} rounds")
+        print(f"{'variant':<14}{'p50 ms':>10}{'p99 ms':>10}")
+        print(f"{'sequential':<14}{seq_p50:>10.2f}{seq_p99:>10.2f}")
+        print(f"{'concurrent':<14}{con_p50:>10.2f}{con_p99:>10.2f}")
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,7 @@ import TestSolutions from "./components/TestSolutions";
 import Cart from "./components/Cart";
 import ProfilePage from "./components/ProfilePage";
 import { Toaster } from "./components/ui/sonner";
+import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -46,9 +47,53 @@ const AuthProvider = ({ children }) => {
     initAuth();
   }, []);
 
-  const login = (token, user) => {
+  // Swap expired access tokens for new ones using the refresh token, so
+  // long tests never force a full re-login
+  useEffect(() => {
+    let refreshing = null;
+
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (
+          error.response?.status !== 401 ||
+          !refreshToken ||
+          !original ||
+          original._retried ||
+          original.url === `${API}/token/refresh`
+        ) {
+          return Promise.reject(error);
+        }
+
+        original._retried = true;
+        try {
+          // Refresh tokens are single-use: concurrent 401s share one rotation
+          refreshing = refreshing || axios.post(`${API}/token/refresh`, { refresh_token: refreshToken });
+          const response = await refreshing;
+          const { access_token, refresh_token, user } = response.data;
+          login(access_token, user, refresh_token);
+          original.headers = { ...original.headers, Authorization: `Bearer ${access_token}` };
+          return axios(original);
+        } catch (refreshError) {
+          logout();
+          return Promise.reject(error);
+        } finally {
+          refreshing = null;
+        }
+      }
+    );
+
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
+  const login = (token, user, refreshToken) => {
     localStorage.setItem('token', token);
     localStorage.setItem('user', JSON.stringify(user));
+    if (refreshToken) {
+      localStorage.setItem('refresh_token', refreshToken);
+    }
     setToken(token);
     setUser(user);
   };
@@ -56,6 +101,7 @@ const AuthProvider = ({ children }) => {
   const logout = () => {
     localStorage.removeItem('token');
     localStorage.removeItem('user');
+    localStorage.removeItem('refresh_token');
     setToken(null);
     setUser(null);
   };
@@ -29,6 +29,7 @@ import {
 import { toast } from 'sonner';
 import { useAuth } from '../App';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -80,8 +81,7 @@ const AdminDashboard = () => {
 
   const fetchTests = async () => {
     try {
-      const response = await axios.get(`${API}/admin/tests`, axiosConfig);
-      setTests(response.data);
+      setTests(await fetchAllPages(`${API}/admin/tests`, axiosConfig));
     } catch (error) {
       console.error('Error fetching tests:', error);
       toast.error('Failed to fetch tests');
@@ -90,8 +90,7 @@ const AdminDashboard = () => {
 
   const fetchStudents = async () => {
     try {
-      const response = await axios.get(`${API}/admin/students`, axiosConfig);
-      setStudents(response.data);
+      setStudents(await fetchAllPages(`${API}/admin/students`, axiosConfig));
     } catch (error) {
       console.error('Error fetching students:', error);
       toast.error('Failed to fetch students');
@@ -34,9 +34,9 @@ const LoginPage = () => {
 
     try {
       const response = await axios.post(`${API}/login`, formData);
-      const { access_token, user } = response.data;
+      const { access_token, user, refresh_token } = response.data;
       
-      login(access_token, user);
+      login(access_token, user, refresh_token);
       toast.success('Login successful!');
       
       // Redirect based on role
@@ -46,7 +46,7 @@ const ProfilePage = () => {
 
       if (response.ok) {
         // Login successful, update auth context
-        login(data.user, data.access_token);
+        login(data.access_token, data.user, data.refresh_token);
         
         toast.success(`Welcome, ${data.user.name}! Signed in with Google.`);
         
@@ -20,6 +20,7 @@ import { toast } from 'sonner';
 import { useAuth } from '../App';
 import PaymentDialog from './PaymentDialog';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -35,42 +36,33 @@ const StudentDashboard = () => {
   const [selectedTest, setSelectedTest] = useState(null);
 
   useEffect(() => {
-    fetchAvailableTests();
-    fetchPurchasedTests();
-    fetchResults();
+    fetchDashboard();
   }, []);
 
   const axiosConfig = {
     headers: { Authorization: `Bearer ${token}` }
   };
 
-  const fetchAvailableTests = async () => {
+  // Loads everything the dashboard shows in one request; only lists longer
+  // than a page fall back to their own paginated endpoints
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/tests`);
-      setAvailableTests(response.data);
+      const response = await axios.get(`${API}/dashboard`, axiosConfig);
+      const { available_tests, purchased_tests, results, next_cursors } = response.data;
+      const remaining = (path, cursor) => cursor
+        ? fetchAllPages(`${API}/${path}`, { ...axiosConfig, params: { cursor } })
+        : [];
+      const [moreAvailable, morePurchased, moreResults] = await Promise.all([
+        remaining('tests', next_cursors.available_tests),
+        remaining('my-tests', next_cursors.purchased_tests),
+        remaining('my-results', next_cursors.results)
+      ]);
+      setAvailableTests([...available_tests, ...moreAvailable]);
+      setPurchasedTests([...purchased_tests, ...morePurchased]);
+      setResults([...results, ...moreResults]);
     } catch (error) {
-      console.error('Error fetching available tests:', error);
-      toast.error('Failed to fetch available tests');
-    }
-  };
-
-  const fetchPurchasedTests = async () => {
-    try {
-      const response = await axios.get(`${API}/my-tests`, axiosConfig);
-      setPurchasedTests(response.data);
-    } catch (error) {
-      console.error('Error fetching purchased tests:', error);
-      toast.error('Failed to fetch purchased tests');
-    }
-  };
-
-  const fetchResults = async () => {
-    try {
-      const response = await axios.get(`${API}/my-results`, axiosConfig);
-      setResults(response.data);
-    } catch (error) {
-      console.error('Error fetching results:', error);
-      toast.error('Failed to fetch results');
+      console.error('Error fetching dashboard:', error);
+      toast.error('Failed to load dashboard');
     }
   };
 
@@ -80,8 +72,7 @@ const StudentDashboard = () => {
   };
 
   const handlePaymentSuccess = () => {
-    fetchPurchasedTests();
-    fetchAvailableTests();
+    fetchDashboard();
   };
 
   const startTest = (testId) => {
@@ -425,7 +416,7 @@ const StudentDashboard = () => {
                         <div className="flex items-center space-x-4">
                           <div className="text-center">
                             <p className="text-2xl font-bold text-gray-900">{result.score}</p>
-                            <p className="text-sm text-gray-600">out of {result.total_questions}</p>
+                            <p className="text-sm text-gray-600">out of {result.max_score ?? result.total_questions}</p>
                           </div>
                           
                           <div className="text-center">
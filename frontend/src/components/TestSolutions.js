@@ -128,7 +128,7 @@ const TestSolutions = () => {
                   {solutions.percentage}%
                 </div>
                 <p className="text-gray-600">
-                  {solutions.student_score} out of {solutions.total_questions} correct
+                  {solutions.correct_count ?? solutions.student_score} out of {solutions.total_questions} correct
                 </p>
               </div>
             </div>
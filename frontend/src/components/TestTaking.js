@@ -125,7 +125,7 @@ const TestTaking = () => {
           showResult: true, 
           result: {
             score: result.score,
-            total: result.total_questions,
+            total: result.max_score ?? result.total_questions,
             percentage: result.percentage,
             testTitle: test.title
           }
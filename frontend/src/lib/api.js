@@ -0,0 +1,15 @@
+import axios from 'axios';
+
+// List endpoints return one page at a time and point at the next one with
+// the X-Next-Cursor header; follow it until the last page.
+export const fetchAllPages = async (url, config = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const params = cursor ? { ...config.params, cursor } : config.params;
+    const response = await axios.get(url, { ...config, params });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
@@ -0,0 +1,27 @@
+import server
+
+
+def test_evicts_least_recently_used_by_size():
+    dropped = []
+    cache = server.BoundedLRU(max_size=10, on_drop=lambda key, value: dropped.append(key))
+    cache.put("a", "A", size=4)
+    cache.put("b", "B", size=4)
+    cache.get("a")
+    cache.put("c", "C", size=4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.size == 8
+    assert dropped == ["b"]
+    assert cache.evictions == 1
+
+
+def test_expired_entries_miss_and_are_dropped():
+    dropped = []
+    cache = server.BoundedLRU(max_size=10, on_drop=lambda key, value: dropped.append(key))
+    cache.put("a", "A", ttl_seconds=-1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert dropped == ["a"]
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,84 @@
+"""list_results must issue a constant number of queries however many results a page holds."""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+import server
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for list_results, counting every query"""
+
+    def __init__(self, db, docs):
+        self.db = db
+        self.docs = docs
+
+    def aggregate(self, pipeline):
+        self.db.queries += 1
+        match = pipeline[0]["$match"]
+        limit = next(stage["$limit"] for stage in pipeline if "$limit" in stage)
+        docs = [doc for doc in self.docs if all(doc.get(key) == value for key, value in match.items())]
+        return FakeCursor(docs[:limit])
+
+    def find(self, query, projection=None):
+        self.db.queries += 1
+        wanted = set(query["id"]["$in"])
+        return FakeCursor([{"id": doc["id"], "title": doc["title"]} for doc in self.docs if doc["id"] in wanted])
+
+
+class FakeDatabase:
+    def __init__(self, tests, results):
+        self.queries = 0
+        self.tests = FakeCollection(self, tests)
+        self.test_results = FakeCollection(self, results)
+
+
+def make_db(student_id, result_count):
+    tests = [{"id": str(uuid.uuid4()), "title": f"Mock {i}"} for i in range(10)]
+    results = [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "test_id": tests[i % len(tests)]["id"],
+            "score": 2,
+            "total_questions": 3,
+            "completed_at": datetime.now(timezone.utc),
+            "time_taken_minutes": 5,
+        }
+        for i in range(result_count)
+    ]
+    return FakeDatabase(tests, results)
+
+
+@pytest.mark.parametrize("result_count", [1, 60])
+def test_list_results_query_count_is_constant(monkeypatch, result_count):
+    student_id = str(uuid.uuid4())
+    fake_db = make_db(student_id, result_count)
+    monkeypatch.setattr(server, "db", fake_db)
+
+    results, next_cursor = asyncio.run(server.list_results(student_id, limit=100))
+
+    assert len(results) == result_count
+    assert next_cursor is None
+    # One page query and one title lookup, never one query per result
+    assert fake_db.queries == 2
+    assert all(result["test_title"].startswith("Mock") for result in results)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import server
+
+
+def make_test(questions=6, **scheme):
+    return {
+        "questions": [
+            {
+                "correct_answer": i % 4,
+                "options": ["a", "b", "c", "d"],
+                "section": ["Polity", "History"][i % 2],
+            }
+            for i in range(questions)
+        ],
+        "marking_scheme": scheme,
+    }
+
+
+@pytest.mark.parametrize("answers", [[], [0, 1, 2, 3, -1, 6], [2] * 120, [7, 0, -1]])
+def test_pack_answers_round_trips(answers):
+    packed = server.pack_answers(answers)
+
+    assert server.unpack_answers(packed) == answers
+
+
+def test_pack_answers_uses_three_bits_per_answer():
+    packed = server.pack_answers([3] * 120)
+
+    assert len(packed) == 3 + 120 * 3 // 8
+
+
+def test_pack_answers_rejects_too_many_answers():
+    with pytest.raises(ValueError):
+        server.pack_answers([0] * (server.MAX_PACKED_ANSWERS + 1))
+
+
+def test_unpack_answers_reads_legacy_arrays():
+    assert server.unpack_answers([0, 1, -1]) == [0, 1, -1]
+
+
+def test_answer_matrix_sanitises_answers():
+    key = server.AnswerKey(make_test(questions=4))
+
+    matrix = key.answer_matrix([[0, 9, -5, 3, 1], [1]])
+
+    assert matrix.tolist() == [[0, -1, -1, 3], [1, -1, -1, -1]]
+
+
+def test_default_scheme_counts_correct_answers():
+    key = server.AnswerKey(make_test())
+
+    scored = key.score([0, 1, 2, 3, 0, 0])
+
+    assert scored["score"] == 5
+    assert scored["max_score"] == 6
+    assert (scored["correct_count"], scored["wrong_count"], scored["unattempted_count"]) == (5, 1, 0)
+
+
+def test_negative_marking_and_section_weights():
+    key = server.AnswerKey(make_test(marks_per_question=2, negative_marking_ratio=1 / 3, section_weights={"History": 1.5}))
+
+    scored = key.score([1, 1, 1, -1, 9])
+
+    assert scored["score"] == 1.67
+    assert scored["max_score"] == 15
+    polity, history = scored["sections"]
+    assert (polity["name"], polity["score"], polity["wrong"], polity["unattempted"]) == ("Polity", -1.33, 2, 1)
+    assert (history["name"], history["score"], history["correct"], history["max_score"]) == ("History", 3.0, 1, 9.0)
+
+
+def test_score_batch_matches_single_scores():
+    key = server.AnswerKey(make_test(negative_marking_ratio=1 / 3))
+    submissions = np.random.default_rng(0).integers(-1, 4, size=(50, 6)).tolist()
+
+    rows = key.score_batch(submissions).rows()
+
+    assert rows == [key.score(answers) for answers in submissions]
+
+
+def test_question_create_rejects_out_of_range_key():
+    with pytest.raises(ValueError):
+        server.QuestionCreate(question_text="q", options=["a", "b"], correct_answer=3)
+
+
+def test_paper_with_out_of_range_key_still_renders():
+    paper = server.TestPaper({
+        "id": "t1",
+        "title": "Mock",
+        "description": "",
+        "duration_minutes": 10,
+        "questions": [{"id": "q1", "question_text": "q", "options": ["a", "b"], "correct_answer": 3}],
+    })
+
+    assert b'"correct_option":null' in paper.solutions.render([0])
+    assert paper.answer_key.score([0])["correct_count"] == 0
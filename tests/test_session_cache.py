@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+import server
+
+
+def make_principal(user_id):
+    return server.AuthPrincipal(user_id, f"{user_id}@example.com", "Aspirant", "student")
+
+
+def test_session_change_invalidates_by_document_id():
+    cache = server.SessionCache(max_entries=10, ttl_seconds=60)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    cache.put("token-1", make_principal("u1"), expires_at, session_id="s1")
+    cache.put("token-2", make_principal("u2"), expires_at, session_id="s2")
+
+    cache.invalidate(session_id="s1")
+
+    assert cache.get("token-1") is None
+    assert cache.get("token-2").id == "u2"
+
+
+def test_eviction_forgets_document_ids():
+    cache = server.SessionCache(max_entries=1, ttl_seconds=60)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    cache.put("token-1", make_principal("u1"), expires_at, session_id="s1")
+    cache.put("token-2", make_principal("u2"), expires_at, session_id="s2")
+
+    cache.invalidate(session_id="s1")
+
+    assert cache.get("token-2").id == "u2"
+    assert cache.stats()["evictions"] == 1